@@ -0,0 +1,9 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Performance benchmarks of ``filetool``. Run them from the repository root,
+for example::
+
+    python -m benchmark.walk
+"""
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+``FileCollection.find_duplicates`` against hashing every file, on a synthetic
+tree with a known duplicate rate.
+
+Usage::
+
+    python -m benchmark.duplicates
+"""
+
+from __future__ import print_function
+
+import os
+import random
+import tempfile
+
+from filetool.files import FileCollection
+from benchmark.tree import remove_tree, timeit
+
+
+def make_duplicate_tree(n_file=2000, dup_rate=0.1, seed=0):
+    """Create ``n_file`` files, ``dup_rate`` of them are copies of another
+    file. Sizes are drawn from a small set so many files share a size, and
+    half of the same-size files also share their first 64 KB.
+
+    :return: ``(root, n_duplicate)``
+    """
+    rnd = random.Random(seed)
+    root = tempfile.mkdtemp(prefix="filetool-benchmark-")
+    sizes = [1024, 64 * 1024, 256 * 1024, 1024 * 1024]
+    common_head = os.urandom(64 * 1024)
+
+    n_duplicate = int(n_file * dup_rate)
+    originals = list()
+    for i in range(n_file - n_duplicate):
+        size = rnd.choice(sizes)
+        if size > len(common_head) and rnd.random() < 0.5:
+            content = common_head + os.urandom(size - len(common_head))
+        else:
+            content = os.urandom(size)
+        dir_path = os.path.join(root, "dir%02d" % (i % 20))
+        if not os.path.exists(dir_path):
+            os.mkdir(dir_path)
+        abspath = os.path.join(dir_path, "file%05d.bin" % i)
+        with open(abspath, "wb") as f:
+            f.write(content)
+        originals.append(content)
+
+    for i in range(n_duplicate):
+        abspath = os.path.join(root, "dir%02d" % (i % 20), "copy%05d.bin" % i)
+        with open(abspath, "wb") as f:
+            f.write(originals[i])
+
+    return root, n_duplicate
+
+
+def find_duplicates_by_full_hash(fc):
+    groups = dict()
+    fc.load_md5()
+    for winfile in fc.iterfiles():
+        groups.setdefault(winfile.md5, list()).append(winfile)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def main():
+    root, n_duplicate = make_duplicate_tree()
+    try:
+        n_copy = sum([
+            len(group) - 1 for group, _ in
+            FileCollection.from_path(root).find_duplicates()
+        ])
+        print("%s duplicates expected, %s found" % (n_duplicate, n_copy))
+        assert n_copy == n_duplicate
+
+        t1 = timeit(lambda: find_duplicates_by_full_hash(
+            FileCollection.from_path(root)))
+        t2 = timeit(lambda: FileCollection.from_path(root).find_duplicates())
+        print("full md5 of every file: %.3f sec" % t1)
+        print("find_duplicates: %.3f sec" % t2)
+        print("speed up: %.2fx" % (t1 / t2))
+    finally:
+        remove_tree(root)
+
+
+if __name__ == "__main__":
+    main()
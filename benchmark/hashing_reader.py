@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Throughput of the file hashing reader: the old buffered ``f.read()`` loop,
+against the ``hashfile`` modes, an unbuffered ``read`` loop (the default),
+``readinto`` a reused buffer, and ``mmap``.
+
+Usage::
+
+    python -m benchmark.hashing_reader
+    python -m benchmark.hashing_reader 1K 1M 64M 1G 10G
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import hashlib
+import tempfile
+
+from filetool.meth import hashfile
+from benchmark.tree import timeit
+
+UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(text):
+    if text[-1].upper() in UNITS:
+        return int(text[:-1]) * UNITS[text[-1].upper()]
+    return int(text)
+
+
+def md5_by_read(abspath):
+    """The reading loop used before, a new bytes object per 256 KB chunk.
+    """
+    m = hashlib.md5()
+    with open(abspath, "rb") as f:
+        while True:
+            data = f.read(4 * 1 << 16)
+            if not data:
+                break
+            m.update(data)
+    return m.hexdigest()
+
+
+def make_file(size):
+    fd, abspath = tempfile.mkstemp(prefix="filetool-benchmark-")
+    block = os.urandom(1 << 20)
+    with os.fdopen(fd, "wb") as f:
+        remain = size
+        while remain > 0:
+            f.write(block[:min(remain, len(block))])
+            remain -= len(block)
+    return abspath
+
+
+def main(size_list=("1K", "64K", "1M", "16M", "256M")):
+    modes = ("read", "readinto", "mmap")
+    print("%8s %12s" % ("size", "old") + "".join(
+        " %12s" % mode for mode in modes))
+    for text in size_list:
+        size = parse_size(text)
+        abspath = make_file(size)
+        try:
+            expected = md5_by_read(abspath)
+            for mode in modes:
+                assert hashfile(abspath, mode=mode)["md5"] == expected
+
+            repeat = max(1, min(100, (1 << 28) // max(size, 1)))
+            result = list()
+            for func in [lambda: md5_by_read(abspath)] + [
+                    (lambda mode=mode: hashfile(abspath, mode=mode))
+                    for mode in modes]:
+                elapsed = timeit(
+                    lambda: [func() for _ in range(repeat)], repeat=3)
+                result.append(size * repeat / elapsed / (1 << 20))
+            print("%8s" % text + "".join(
+                " %7.1f MB/s" % speed for speed in result))
+        finally:
+            os.remove(abspath)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(sys.argv[1:])
+    else:
+        main()
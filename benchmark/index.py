@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare linear ``FileCollection.select`` against the ``select_by_*`` methods
+using the secondary indexes, on a large collection of synthetic WinFile,
+created in memory without touching the disk.
+
+Usage::
+
+    python -m benchmark.index
+
+``N_FILE`` files take about 1 KB of memory each, with the indexes. Set it to
+5000000 on a machine with enough memory.
+"""
+
+from __future__ import print_function
+
+import random
+from collections import OrderedDict
+
+from filetool.files import WinFile, FileCollection
+from benchmark.tree import timeit
+
+N_FILE = 1000000
+
+
+def make_collection(n_file, n_dir=10000, seed=0):
+    rnd = random.Random(seed)
+    exts = [".txt", ".py", ".log", ".jpg", ".mp3", ".json", ".csv", ".mp4"]
+    files = OrderedDict()
+    for i in range(n_file):
+        winfile = WinFile.__new__(WinFile)
+        winfile.abspath = "/data/dir%05d/file%07d%s" % (
+            rnd.randrange(n_dir), i, exts[i % len(exts)])
+        winfile.size_on_disk = int(rnd.lognormvariate(10, 3))
+        winfile.mtime_ns = winfile.atime_ns = winfile.ctime_ns = \
+            rnd.randrange(1 << 60)
+        files[winfile.abspath] = winfile
+    fc = FileCollection()
+    fc.files = files
+    return fc
+
+
+def main():
+    fc = make_collection(N_FILE)
+    print("%s files" % len(fc))
+    print("create_index: %.3f sec" % timeit(fc.create_index, repeat=1))
+
+    mtime_start = sorted(
+        winfile.mtime_ns for winfile in fc.iterfiles())[-len(fc) // 1000]
+    for label, linear, indexed in [
+            ("ext == .mp4",
+             lambda: fc.select(lambda winfile: winfile.ext == ".mp4"),
+             lambda: fc.select_by_ext(".mp4")),
+            ("dirname == /data/dir00042",
+             lambda: fc.select(
+                 lambda winfile: winfile.dirname == "/data/dir00042"),
+             lambda: fc.select_by_dirname("/data/dir00042")),
+            ("size >= 1 GB",
+             lambda: fc.select(
+                 lambda winfile: winfile.size_on_disk >= 1 << 30),
+             lambda: fc.select_by_size(min_size=1 << 30)),
+            ("newest 0.1%",
+             lambda: fc.select(
+                 lambda winfile: winfile.mtime_ns >= mtime_start),
+             lambda: fc.select_by_time(start=mtime_start))]:
+        n = len(indexed())
+        assert n == len(linear())
+        t1, t2 = timeit(linear), timeit(indexed)
+        print("%s, %s files: select %.3f sec, index %.4f sec, "
+              "speed up %.0fx" % (label, n, t1, t2, t1 / t2))
+
+
+if __name__ == "__main__":
+    main()
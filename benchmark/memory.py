@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare the memory per file of :class:`filetool.files.FileCollection` (one
+WinFile per file) against :class:`filetool.columnar.ColumnarFileCollection`,
+measured with ``tracemalloc``.
+
+Usage::
+
+    python -m benchmark.memory
+"""
+
+from __future__ import print_function
+
+import gc
+import tracemalloc
+
+from filetool.files import FileCollection
+from filetool.columnar import ColumnarFileCollection
+from benchmark.tree import make_tree, remove_tree
+
+
+def retained_memory(func):
+    """Return ``(result, bytes still allocated after func() returns, peak
+    bytes allocated while it runs)``.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        return result, current, peak
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    root = make_tree(n_dir=500, n_file_per_dir=200)
+    try:
+        for label, func in [
+                ("FileCollection, detail=1",
+                 lambda: FileCollection.from_path(root, detail=1)),
+                ("FileCollection, detail=2",
+                 lambda: FileCollection.from_path(root, detail=2)),
+                ("ColumnarFileCollection",
+                 lambda: ColumnarFileCollection.from_path(root)),
+                ("ColumnarFileCollection, [root]",
+                 lambda: ColumnarFileCollection.from_path([root]))]:
+            fc, size, peak = retained_memory(func)
+            print("%s: %s files, %.1f MB, %.0f bytes per file, "
+                  "peak %.0f bytes per file" % (
+                      label, len(fc), size / 1024.0 / 1024.0,
+                      float(size) / len(fc), float(peak) / len(fc)))
+            del fc
+    finally:
+        remove_tree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Scaling curve of ``FileCollection.from_path(..., workers=N)`` against a
+simulated per-syscall latency, like a network file system.
+
+Every ``scandir`` and every ``DirEntry.stat`` call sleeps ``latency`` seconds.
+
+Usage::
+
+    python -m benchmark.parallel_walk
+"""
+
+from __future__ import print_function
+
+import time
+
+from filetool import walker
+from filetool.files import FileCollection
+from benchmark.tree import make_tree, remove_tree, timeit
+
+
+class SlowEntry(object):
+    """Wrap a ``DirEntry``, ``stat()`` costs ``latency`` seconds.
+    """
+
+    def __init__(self, entry, latency):
+        self._entry = entry
+        self._latency = latency
+        self.name = entry.name
+        self.path = entry.path
+
+    def stat(self, follow_symlinks=True):
+        time.sleep(self._latency)
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def is_dir(self, follow_symlinks=True):
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, follow_symlinks=True):
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+    def is_symlink(self):
+        return self._entry.is_symlink()
+
+
+def simulate_latency(latency):
+    original = walker._scandir
+
+    def _scandir(dir_abspath):
+        time.sleep(latency)
+        return [SlowEntry(entry, latency) for entry in original(dir_abspath)]
+
+    walker._scandir = _scandir
+    return original
+
+
+def main(latency=0.001, workers_list=(1, 2, 4, 8, 16, 32)):
+    root = make_tree(n_dir=100, n_file_per_dir=10)
+    original = simulate_latency(latency)
+    try:
+        print("simulated latency: %.1f ms per syscall" % (latency * 1000))
+        expected = list(FileCollection.from_path(root, detail=2))
+        base = None
+        for workers in workers_list:
+            fc = FileCollection.from_path(root, detail=2, workers=workers)
+            assert list(fc) == expected
+
+            elapsed = timeit(
+                lambda: FileCollection.from_path(
+                    root, detail=2, workers=workers),
+                repeat=1,
+            )
+            if base is None:
+                base = elapsed
+            print("workers = %2s: %.3f sec, speed up %.2fx" % (
+                workers, elapsed, base / elapsed))
+    finally:
+        walker._scandir = original
+        remove_tree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare selecting files by extension with a criterion which doesn't declare
+its attributes (every file is ``stat``'ed) against one declared with
+``@requires("ext")`` (only the selected files are ``stat``'ed).
+
+Usage::
+
+    python -m benchmark.pushdown
+"""
+
+from __future__ import print_function
+
+from filetool.files import FileCollection, requires
+from benchmark.tree import make_tree, remove_tree, timeit
+
+
+def is_py(winfile):
+    return winfile.ext == ".py"
+
+
+@requires("ext")
+def is_py_declared(winfile):
+    return winfile.ext == ".py"
+
+
+def main():
+    root = make_tree(n_dir=200, n_file_per_dir=100)
+    try:
+        fc = FileCollection.from_path_by_criterion(root, is_py_declared)
+        print("%s .py files" % len(fc))
+        t1 = timeit(lambda: FileCollection.from_path_by_criterion(
+            root, is_py, detail=2))
+        t2 = timeit(lambda: FileCollection.from_path_by_criterion(
+            root, is_py_declared, detail=2))
+        print("undeclared criterion: %.3f sec" % t1)
+        print("@requires('ext') criterion: %.3f sec" % t2)
+        print("speed up: %.2fx" % (t1 / t2))
+    finally:
+        remove_tree(root)
+
+
+if __name__ == "__main__":
+    main()
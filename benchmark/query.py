@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare "the newest 100 log files" computed with ``from_path_by_ext`` +
+``sort_by`` against a :class:`filetool.query.FileQuery`, peak memory and
+wall time.
+
+Usage::
+
+    python -m benchmark.query
+"""
+
+from __future__ import print_function
+
+import tracemalloc
+
+from filetool.files import FileCollection
+from filetool.query import FileQuery
+from benchmark.tree import make_tree, remove_tree, timeit
+
+
+def newest_by_collection(root, n):
+    fc = FileCollection.from_path_by_ext(root, ".log", detail=2)
+    fc.sort_by("mtime", reverse=True)
+    return [fc.files[abspath] for abspath in fc.order[:n]]
+
+
+def newest_by_query(root, n):
+    return list(FileQuery(root).where(ext=".log")
+                .order_by("mtime", reverse=True).limit(n))
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    root = make_tree(n_dir=300, n_file_per_dir=200)
+    try:
+        for label, func in [
+                ("from_path_by_ext + sort_by", newest_by_collection),
+                ("FileQuery", newest_by_query)]:
+            elapsed = timeit(lambda: func(root, 100))
+            peak = peak_memory(lambda: func(root, 100))
+            print("%s: %.3f sec, peak memory %.1f MB" % (
+                label, elapsed, peak / 1024.0 / 1024.0))
+    finally:
+        remove_tree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare the per rule Python loop of ``from_path_except`` against the compiled
+:class:`filetool.rules.RuleSet`, with a few hundred ignore rules.
+
+Usage::
+
+    python -m benchmark.rules
+"""
+
+from __future__ import print_function
+
+import os
+
+from filetool.rules import RuleSet
+from benchmark.tree import make_tree, remove_tree, timeit
+
+
+def make_rules(n_rule):
+    ignore = ["ignored%03d" % i for i in range(n_rule)]
+    ignore_ext = [".ext%03d" % i for i in range(n_rule)]
+    ignore_pattern = ["pattern%03d" % i for i in range(n_rule)]
+    return ignore, ignore_ext, ignore_pattern
+
+
+def match_by_loop(relpath_list, ignore, ignore_ext, ignore_pattern):
+    kept = 0
+    for relpath in relpath_list:
+        relpath = relpath.lower()
+        if os.path.splitext(relpath)[1] in ignore_ext:
+            continue
+        if [path for path in ignore if relpath.startswith(path)]:
+            continue
+        if [pattern for pattern in ignore_pattern if pattern in relpath]:
+            continue
+        kept += 1
+    return kept
+
+
+def match_by_rule_set(relpath_list, rule_set):
+    kept = 0
+    for relpath in relpath_list:
+        if not rule_set.match(relpath):
+            kept += 1
+    return kept
+
+
+def main():
+    root = make_tree(n_dir=100, n_file_per_dir=100)
+    try:
+        relpath_list = list()
+        for current_dir, _, fname_list in os.walk(root):
+            for fname in fname_list:
+                relpath_list.append(os.path.relpath(
+                    os.path.join(current_dir, fname), root))
+        print("%s files" % len(relpath_list))
+
+        for n_rule in (10, 100, 300):
+            ignore, ignore_ext, ignore_pattern = make_rules(n_rule)
+            rule_set = RuleSet.from_ignore_list(
+                ignore, ignore_ext, ignore_pattern)
+            t1 = timeit(lambda: match_by_loop(
+                relpath_list, ignore, ignore_ext, ignore_pattern))
+            t2 = timeit(lambda: match_by_rule_set(relpath_list, rule_set))
+            print("%s rules of each kind:" % n_rule)
+            print("    python loop: %.3f sec" % t1)
+            print("    RuleSet: %.3f sec" % t2)
+            print("    speed up: %.2fx" % (t1 / t2))
+    finally:
+        remove_tree(root)
+
+
+if __name__ == "__main__":
+    main()
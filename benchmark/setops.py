@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare FileCollection union and difference which ``deepcopy`` the left
+operand (the former implementation) against the set operators sharing
+WinFile objects.
+
+Usage::
+
+    python -m benchmark.setops
+"""
+
+from __future__ import print_function
+
+import copy
+
+from filetool.files import FileCollection
+from benchmark.tree import make_tree, remove_tree, timeit
+
+
+def deepcopy_add(fc1, fc2):
+    fc = copy.deepcopy(fc1)
+    for winfile in fc2.iterfiles():
+        fc.files.setdefault(winfile.abspath, winfile)
+    return fc
+
+
+def deepcopy_sub(fc1, fc2):
+    fc = copy.deepcopy(fc1)
+    for abspath in fc2.iterpaths():
+        try:
+            del fc.files[abspath]
+        except:
+            pass
+    return fc
+
+
+def main():
+    root = make_tree(n_dir=300, n_file_per_dir=200)
+    try:
+        fc = FileCollection.from_path(root, detail=2)
+        paths = list(fc)
+        half, third = set(paths[::2]), set(paths[::3])
+        fc1 = fc.select(lambda winfile: winfile.abspath in half)
+        fc2 = fc.select(lambda winfile: winfile.abspath in third)
+        print("%s files, %s and %s in the operands" % (
+            len(fc), len(fc1), len(fc2)))
+
+        assert list(deepcopy_add(fc1, fc2)) == list(fc1 + fc2)
+        assert list(deepcopy_sub(fc1, fc2)) == list(fc1 - fc2)
+        for label, old, new in [
+                ("fc1 + fc2", lambda: deepcopy_add(fc1, fc2),
+                 lambda: fc1 + fc2),
+                ("fc1 - fc2", lambda: deepcopy_sub(fc1, fc2),
+                 lambda: fc1 - fc2)]:
+            t1, t2 = timeit(old), timeit(new)
+            print("%s: deepcopy %.3f sec, shared %.3f sec, speed up %.1fx" % (
+                label, t1, t2, t1 / t2))
+        for label, func in [
+                ("fc1 & fc2", lambda: fc1 & fc2),
+                ("fc1 ^ fc2", lambda: fc1 ^ fc2)]:
+            print("%s: %.3f sec" % (label, timeit(func)))
+    finally:
+        remove_tree(root)
+
+
+if __name__ == "__main__":
+    main()
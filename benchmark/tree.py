@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic directory tree generator used by the benchmarks.
+"""
+
+from __future__ import print_function
+
+import os
+import time
+import random
+import shutil
+import tempfile
+
+
+def make_tree(root=None, n_dir=100, n_file_per_dir=100, file_size=0, seed=0):
+    """Create a directory tree with ``n_dir`` nested directories, each of them
+    has ``n_file_per_dir`` files of ``file_size`` bytes.
+
+    :return: the root directory path.
+    """
+    if root is None:
+        root = tempfile.mkdtemp(prefix="filetool-benchmark-")
+    rnd = random.Random(seed)
+    dir_list = [root, ]
+    for i in range(n_dir):
+        parent = rnd.choice(dir_list)
+        dir_path = os.path.join(parent, "dir%04d" % i)
+        os.mkdir(dir_path)
+        dir_list.append(dir_path)
+
+    exts = [".txt", ".py", ".log", ".jpg", ".mp3", ".json"]
+    content = b"x" * file_size
+    for dir_path in dir_list[1:]:
+        for j in range(n_file_per_dir):
+            abspath = os.path.join(
+                dir_path, "file%04d%s" % (j, exts[j % len(exts)]))
+            with open(abspath, "wb") as f:
+                f.write(content)
+    return root
+
+
+def remove_tree(root):
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def timeit(func, repeat=3):
+    """Return the best wall time of ``repeat`` runs of ``func()``.
+    """
+    best = None
+    for _ in range(repeat):
+        st = time.time()
+        func()
+        elapsed = time.time() - st
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare the ``os.walk`` + ``WinFile(abspath)`` scan against the ``os.scandir``
+walk engine behind ``FileCollection.yield_all_*``. Both sides load the stat
+attributes (``detail=2``), like the ``os.walk`` scan did by default.
+
+Usage::
+
+    python -m benchmark.walk
+"""
+
+from __future__ import print_function
+
+import os
+
+from filetool.files import WinFile, FileCollection
+from benchmark.tree import make_tree, remove_tree, timeit
+
+
+def scan_by_os_walk(root):
+    files = list()
+    for current_folder, _, fnamelist in os.walk(root):
+        for fname in fnamelist:
+            files.append(
+                WinFile(os.path.join(current_folder, fname), detail=2))
+    return files
+
+
+def scan_by_scandir(root):
+    return list(FileCollection.yield_all_winfile(root, detail=2))
+
+
+def main():
+    root = make_tree(n_dir=200, n_file_per_dir=100)
+    try:
+        n_file = len(scan_by_scandir(root))
+        print("%s files" % n_file)
+        t1 = timeit(lambda: scan_by_os_walk(root))
+        t2 = timeit(lambda: scan_by_scandir(root))
+        print("os.walk + WinFile(abspath), detail=2: %.3f sec" % t1)
+        print("os.scandir + WinFile.from_entry, detail=2: %.3f sec" % t2)
+        print("speed up: %.2fx" % (t1 / t2))
+    finally:
+        remove_tree(root)
+
+
+if __name__ == "__main__":
+    main()
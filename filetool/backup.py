@@ -12,12 +12,13 @@ from zipfile import ZipFile
 from datetime import datetime
 
 try:
-    from .files import WinFile, FileCollection, repr_data_size
+    from .files import FileCollection, repr_data_size
 except:
-    from filetool.files import WinFile, FileCollection, repr_data_size
+    from filetool.files import FileCollection, repr_data_size
 
 
-def backup_dir(filename, root_dir, ignore=None, ignore_ext=None, ignore_pattern=None):
+def backup_dir(filename, root_dir, ignore=None, ignore_ext=None, ignore_pattern=None,
+               rules=None):
     """The backup utility method. Basically it just add files that need to be
     backupped to zip archives.
 
@@ -27,6 +28,8 @@ def backup_dir(filename, root_dir, ignore=None, ignore_ext=None, ignore_pattern=
     :param ignore_ext: file with extensions defined in this list will be ignored.
     :param ignore_pattern: any file or directory that contains this pattern
       will be ignored.
+    :param rules: gitignore style rules, see
+      :meth:`filetool.files.FileCollection.from_path_except`.
     """
     tab = "    "
     # Step 1, calculate files to backup
@@ -36,12 +39,10 @@ def backup_dir(filename, root_dir, ignore=None, ignore_ext=None, ignore_pattern=
 
     total_size_in_bytes = 0
 
-    init_mode = WinFile.init_mode
-    WinFile.use_regular_init()
     fc = FileCollection.from_path_except(
-        root_dir, ignore, ignore_ext, ignore_pattern)
-    WinFile.set_initialize_mode(complexity=init_mode)
+        root_dir, ignore, ignore_ext, ignore_pattern, rules=rules)
 
+    # size_on_disk is loaded on demand, only selected files are stat'ed
     for winfile in fc.iterfiles():
         total_size_in_bytes += winfile.size_on_disk
 
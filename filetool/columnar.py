@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+A columnar, array backed alternative of :class:`filetool.files.FileCollection`
+for millions of files.
+
+A :class:`~filetool.files.WinFile` is a Python object referring to several
+others, the file name, the size and three timestamps, each of them with its
+own object header. Here a file is one row of a few columns:
+
+- size and atime, ctime, mtime in nanoseconds, in ``array("q")``.
+- the parent directory, an index into a table of unique directory paths,
+  in ``array("l")``.
+- the file name, utf-8 encoded in one ``bytearray``, with its offset in an
+  ``array("q")``.
+
+WinFile objects are only created when a file is accessed, see
+:meth:`ColumnarFileCollection.iterfiles`.
+
+**中文文档**
+
+为数百万文件设计的按列存储的FileCollection。文件大小和时间戳存储在
+``array("q")`` 中, 文件名被编码后存储在一个 ``bytearray`` 中, 目录路径只存储一次。
+只有在访问某个文件时, 才会创建对应的WinFile对象。
+"""
+
+import os
+from array import array
+
+try:
+    from .files import WinFile, FileCollection, _time_ns
+except:
+    from filetool.files import WinFile, FileCollection, _time_ns
+
+
+def _outermost(dir_path_list):
+    """Remove the directories which are inside another one of the list, their
+    files are already found by walking the outer one.
+    """
+    result = list()
+    for dir_path in sorted(set(os.path.abspath(p) for p in dir_path_list)):
+        if result and (dir_path + os.sep).startswith(
+                result[-1].rstrip(os.sep) + os.sep):
+            continue
+        result.append(dir_path)
+    return result
+
+
+class ColumnarFileCollection(object):
+    """A compact, append only, container of files.
+
+    Usage::
+
+        fc = ColumnarFileCollection.from_path(dir_path)
+        total_size = sum(fc.size_on_disk)
+        for winfile in fc.iterfiles():
+            ...
+
+    **中文文档**
+
+    按列存储的紧凑型文件集合, 只支持添加文件。
+    """
+
+    def __init__(self):
+        self.dir_list = list()  # 所有不重复的目录路径
+        self._dir_index = dict()  # {目录路径: 在dir_list中的位置}
+
+        self.dir_id = array("l")
+        self.name_offset = array("q", [0, ])
+        self.name_data = bytearray()
+
+        self.size_on_disk = array("q")
+        self.atime_ns = array("q")
+        self.ctime_ns = array("q")
+        self.mtime_ns = array("q")
+
+        self._path_index = None  # {abspath: row}, built on demand
+
+    def __len__(self):
+        return len(self.size_on_disk)
+
+    def add(self, abspath, stat_result):
+        """Add a file by its absolute path and its ``os.stat`` result. A file
+        already in the collection is not added again, the first call builds
+        the ``{abspath: row}`` index, see :meth:`__contains__`.
+
+        :return: True if the file is added.
+        """
+        abspath = os.path.abspath(abspath)
+        if abspath in self:
+            return False
+        self._append(abspath, stat_result.st_size,
+                     _time_ns(stat_result, "st_atime"),
+                     _time_ns(stat_result, "st_ctime"),
+                     _time_ns(stat_result, "st_mtime"))
+        return True
+
+    def add_entry(self, entry):
+        """Add a file from a ``os.DirEntry``, reuse its cached ``stat``.
+        """
+        return self.add(entry.path, entry.stat())
+
+    def _append(self, abspath, size, atime_ns, ctime_ns, mtime_ns):
+        """Append a row, without checking duplicates.
+        """
+        dirname, basename = os.path.split(abspath)
+        try:
+            dir_id = self._dir_index[dirname]
+        except KeyError:
+            dir_id = len(self.dir_list)
+            self.dir_list.append(dirname)
+            self._dir_index[dirname] = dir_id
+
+        self.dir_id.append(dir_id)
+        self.name_data.extend(basename.encode("utf-8", "surrogateescape"))
+        self.name_offset.append(len(self.name_data))
+
+        self.size_on_disk.append(size)
+        self.atime_ns.append(atime_ns)
+        self.ctime_ns.append(ctime_ns)
+        self.mtime_ns.append(mtime_ns)
+
+        if self._path_index is not None:
+            self._path_index[abspath] = len(self) - 1
+
+    def _append_entry(self, entry):
+        stat_result = entry.stat()
+        self._append(entry.path, stat_result.st_size,
+                     _time_ns(stat_result, "st_atime"),
+                     _time_ns(stat_result, "st_ctime"),
+                     _time_ns(stat_result, "st_mtime"))
+
+    @classmethod
+    def from_path(cls, path_or_path_list):
+        """Create a new collection and add all files from ``dir_path``, see
+        :meth:`filetool.files.FileCollection.from_path`. A walk yields each
+        path once, and a root directory inside another root is skipped, so
+        no abspath is kept to remove duplicates.
+        """
+        fc = cls()
+        for dir_path in _outermost(FileCollection._preprocess(
+                path_or_path_list)):
+            for entry in FileCollection.yield_all_file_entry(dir_path):
+                if not entry.is_file():
+                    continue
+                fc._append_entry(entry)
+        return fc
+
+    @classmethod
+    def from_file_collection(cls, file_collection):
+        """Convert a :class:`filetool.files.FileCollection`, files are
+        ``stat``'ed again.
+        """
+        fc = cls()
+        for winfile in file_collection.iterfiles():
+            fc.add(winfile.abspath, os.stat(winfile.abspath))
+        return fc
+
+    def to_file_collection(self):
+        """Convert to a :class:`filetool.files.FileCollection`.
+        """
+        fc = FileCollection()
+        for winfile in self.iterfiles():
+            fc.files.setdefault(winfile.abspath, winfile)
+        return fc
+
+    def basename(self, i):
+        return self.name_data[
+            self.name_offset[i]:self.name_offset[i + 1]
+        ].decode("utf-8", "surrogateescape")
+
+    def dirname(self, i):
+        return self.dir_list[self.dir_id[i]]
+
+    def abspath(self, i):
+        return os.path.join(self.dirname(i), self.basename(i))
+
+    def winfile(self, i):
+        """Create the WinFile of the ``i``th file, with all level 2
+        attributes, from the columns, it doesn't touch the disk.
+        """
+        winfile = WinFile.__new__(WinFile)
+        winfile.abspath = self.abspath(i)
+        winfile.level1_initialize()
+        winfile.size_on_disk = self.size_on_disk[i]
+        winfile.atime_ns = self.atime_ns[i]
+        winfile.ctime_ns = self.ctime_ns[i]
+        winfile.mtime_ns = self.mtime_ns[i]
+        return winfile
+
+    def __getitem__(self, index):
+        """Get the ``index``th file as a WinFile. A slice returns a new
+        ColumnarFileCollection of the selected rows, in the same order.
+        """
+        if isinstance(index, slice):
+            fc = self.__class__()
+            for i in range(*index.indices(len(self))):
+                fc._append(self.abspath(i), self.size_on_disk[i],
+                           self.atime_ns[i], self.ctime_ns[i],
+                           self.mtime_ns[i])
+            return fc
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("file index out of range")
+        return self.winfile(index)
+
+    def iterfiles(self):
+        """Yield all files as WinFile, one at a time.
+        """
+        for i in range(len(self)):
+            yield self.winfile(i)
+
+    def iterpaths(self):
+        """Yield all files' absolute path.
+        """
+        for i in range(len(self)):
+            yield self.abspath(i)
+
+    def __iter__(self):
+        return self.iterpaths()
+
+    def __contains__(self, item):
+        """Test if a path or a WinFile is in this collection. The first call
+        builds a ``{abspath: row}`` index.
+        """
+        if isinstance(item, WinFile):
+            abspath = item.abspath
+        else:
+            abspath = os.path.abspath(item)
+        if self._path_index is None:
+            self._path_index = dict()
+            for i, path in enumerate(self.iterpaths()):
+                self._path_index.setdefault(path, i)
+        return abspath in self._path_index
+
+
+#--- Unittest ---
+if __name__ == "__main__":
+    import unittest
+
+    class Unittest(unittest.TestCase):
+        def test_from_path(self):
+            here = os.path.dirname(os.path.abspath(__file__))
+            fc = ColumnarFileCollection.from_path(here)
+            fc_expected = FileCollection.from_path(here, detail=2)
+            self.assertEqual(len(fc), len(fc_expected))
+            self.assertEqual(list(fc), list(fc_expected))
+            for winfile in fc.iterfiles():
+                expected = fc_expected.files[winfile.abspath]
+                self.assertEqual(winfile.ext, expected.ext)
+                self.assertEqual(winfile.size_on_disk, expected.size_on_disk)
+            self.assertIn(os.path.join(here, "columnar.py"), fc)
+            self.assertEqual(fc[-1].abspath, list(fc_expected)[-1])
+
+            page = fc[1:5:2]
+            self.assertEqual(list(page), list(fc)[1:5:2])
+            self.assertEqual(list(page.size_on_disk),
+                             list(fc.size_on_disk)[1:5:2])
+
+            self.assertEqual(
+                list(ColumnarFileCollection.from_path(
+                    [here, os.path.dirname(here), here])),
+                list(ColumnarFileCollection.from_path(os.path.dirname(here))))
+            self.assertEqual(
+                _outermost(["/a/b", "/a", "/ab", "/a/b/c"]), ["/a", "/ab"])
+
+            n = len(fc)
+            path = os.path.join(here, "columnar.py")
+            self.assertFalse(fc.add(path, os.stat(path)))
+            self.assertEqual(len(fc), n)
+
+    unittest.main()
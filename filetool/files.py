@@ -13,17 +13,153 @@ from __future__ import print_function
 
 import os
 import copy
-from datetime import datetime
+import stat
+import time
+import heapq
+import threading
+from datetime import datetime, timedelta
+from weakref import WeakValueDictionary
 from collections import OrderedDict
 
 try:
     from .py23 import str_type
     from .printer import prt
-    from .meth import repr_data_size, md5file
+    from .meth import repr_data_size, md5file, hashfile, fingerprint
+    from . import walker, hashing
+    from .rules import RuleSet
+    from .index import FileIndex
 except:
     from filetool.py23 import str_type
     from filetool.printer import prt
-    from filetool.meth import repr_data_size, md5file
+    from filetool.meth import repr_data_size, md5file, hashfile, fingerprint
+    from filetool import walker, hashing
+    from filetool.rules import RuleSet
+    from filetool.index import FileIndex
+
+
+#: WinFile attributes computed from the path only, without touching the disk.
+NAME_ATTRS = frozenset(["abspath", "dirname", "basename", "fname", "ext"])
+
+#: WinFile attributes computed from one ``os.stat`` call.
+STAT_ATTRS = frozenset([
+    "size_on_disk", "atime", "ctime", "mtime",
+    "atime_ns", "ctime_ns", "mtime_ns",
+])
+
+#: datetime attributes, and the integer attribute they are derived from.
+TIME_ATTRS = {"atime": "atime_ns", "ctime": "ctime_ns", "mtime": "mtime_ns"}
+
+
+def _time_ns(stat_result, attr):
+    """Return ``stat_result.<attr>_ns``, for example ``st_mtime_ns``.
+    """
+    value = getattr(stat_result, attr + "_ns", None)
+    if value is None:  # python2
+        value = int(getattr(stat_result, attr) * 1000000000)
+    return value
+
+
+def ns_to_datetime(ns):
+    """Convert nanoseconds since epoch to a local time ``datetime``, rounded
+    to the microsecond, same as ``datetime.fromtimestamp(st_mtime)``.
+    """
+    seconds, nanoseconds = divmod(ns, 1000000000)
+    return datetime.fromtimestamp(seconds) + \
+        timedelta(microseconds=(nanoseconds + 500) // 1000)
+
+
+def datetime_to_ns(dt):
+    """Convert a local time ``datetime`` to nanoseconds since epoch, the unit
+    of ``WinFile.mtime_ns``.
+    """
+    return int(time.mktime(dt.timetuple())) * 1000000000 + \
+        dt.microsecond * 1000
+
+
+#: WinFile attributes accepted by ``FileCollection.sort_by`` and
+#: ``FileQuery.order_by``, time attributes are compared as ``*time_ns``.
+SORTABLE_ATTRS = (
+    "abspath", "dirname", "basename", "fname", "ext", "size_on_disk",
+    "atime", "ctime", "mtime", "atime_ns", "ctime_ns", "mtime_ns",
+    "md5", "fingerprint",
+)
+
+
+def _sortable_error():
+    return ValueError(
+        "valid sortable attributes are: %s;" % ", ".join(SORTABLE_ATTRS))
+
+
+def _sort_attr(attr_name):
+    """Sort by the integer timestamp rather than the datetime view.
+    """
+    return TIME_ATTRS.get(attr_name, attr_name)
+
+
+def requires(*attrs):
+    """Decorator, declare the WinFile attributes a criterion function reads.
+
+    :meth:`FileCollection.from_path_by_criterion` uses it to evaluate a
+    criterion which only reads :data:`NAME_ATTRS` before any ``stat`` call,
+    only the selected files are loaded with the requested detail::
+
+        @requires("ext")
+        def filter_image(winfile):
+            return winfile.ext in [".jpg", ".png"]
+
+    **中文文档**
+
+    装饰器, 声明筛选函数需要用到WinFile的哪些属性。只用到文件名相关属性的
+    筛选函数会在访问磁盘之前被执行, 只有被选中的文件才会被完整地初始化。
+    """
+    def decorator(criterion):
+        criterion.requires = frozenset(attrs)
+        return criterion
+    return decorator
+
+
+def _required_detail(criterion):
+    """The detail level a criterion needs, 1 if it only reads names, 2 if it
+    reads anything else, or None if it doesn't declare its attributes.
+    """
+    attrs = getattr(criterion, "requires", None)
+    if attrs is None:
+        return None
+    if attrs <= NAME_ATTRS:
+        return 1
+    return 2
+
+
+class _DirNode(object):
+    """An interned directory path. All WinFile in the same directory refer to
+    the same node, so the directory path string is stored only once, instead
+    of once per file.
+    """
+    __slots__ = ["path", "__weakref__"]
+
+    def __init__(self, path):
+        self.path = path
+
+
+#: {directory path: _DirNode}, a plain intern table, a node lives as long as
+#: a WinFile refers to it.
+_dir_nodes = WeakValueDictionary()
+_dir_nodes_lock = threading.Lock()
+
+
+def _intern_dir(path):
+    """Return the shared :class:`_DirNode` of a directory path. It is thread
+    safe, WinFile are also created in the threads of
+    :func:`filetool.walker.parallel_walk`.
+    """
+    node = _dir_nodes.get(path)
+    if node is None:
+        with _dir_nodes_lock:  # 加锁后再检查一次, 避免同一目录创建多个节点
+            node = _dir_nodes.get(path)
+            if node is None:
+                node = _DirNode(path)
+                _dir_nodes[path] = node
+    return node
 
 
 class WinFile(object):
@@ -39,8 +175,31 @@ class WinFile(object):
     - self.atime          last access time (文件最后一次被触碰的时间)
     - self.ctime          create time (文件被创建的时间)
     - self.mtime          last modify time (文件最后一次被修改的时间)
+    - self.atime_ns       atime, nanoseconds since epoch (整数时间戳, 纳秒)
+    - self.ctime_ns       ctime, nanoseconds since epoch (整数时间戳, 纳秒)
+    - self.mtime_ns       mtime, nanoseconds since epoch (整数时间戳, 纳秒)
     - self.size_on_disk   file size in bytes (文件在硬盘上的大小, 单位bytes)
     - self.md5            md5 value (文件的md5值)
+    - self.digests        {algorithm: hexdigest} (文件的各种哈希值)
+    - self.fingerprint    sampled fingerprint (文件的抽样指纹)
+
+    Use :meth:`WinFile.load_digests` to compute sha256, blake2b, etc. in the
+    same read pass as md5. ``fingerprint`` only reads a few samples of the
+    file, see :func:`filetool.meth.fingerprint`, it is a cheap way to tell
+    whether a huge file has changed.
+
+    atime, ctime, mtime, size_on_disk and md5 are computed on first access,
+    then cached, unless the initialization mode loads them eagerly, see
+    :meth:`WinFile.set_initialize_mode`.
+
+    Only the file name is stored in the WinFile, the parent directory is
+    shared by all files in it. abspath, dirname, fname and ext are derived
+    from them on access, and can be assigned. Likewise only the integer
+    timestamps ``*time_ns`` are stored, the ``datetime`` atime, ctime,
+    mtime are created on access. This keeps the full nanosecond precision
+    of ``os.stat`` and makes a scan, a sort or a time range filter faster,
+    no datetime is built per file; it doesn't save memory, a 64 bit int
+    takes as much as a datetime.
 
     Appendix, The difference of (atime, ctime, mtime):
 
@@ -57,6 +216,13 @@ class WinFile(object):
     Windows文件对象, 可以通过 .属性名的方式访问 绝对路径, 文件夹路径,
     文件名, 扩展名, 大小。免去了使用 ``os.path.split`` 等方法的麻烦。
 
+    atime, ctime, mtime, size_on_disk, md5 这些需要访问磁盘的属性, 在第一次被
+    访问时才会计算, 并缓存下来。
+
+    WinFile只保存文件名, 同一目录下的所有文件共享同一个目录对象。绝对路径,
+    目录路径, 纯文件名, 扩展名都是在访问时计算的。时间只保存纳秒整数, 精度更高,
+    扫描, 排序, 按时间筛选更快, datetime在访问时才创建 (但并不节省内存)。
+
     附录, atime, ctime, mtime的区别
 
     - 当文件被改名, 和剪切(剪切跟改名是一个操作), 所有3个时间都不变
@@ -64,73 +230,263 @@ class WinFile(object):
     - 当文件被复制到新位置时, atime, ctime变化, mtime不变
     """
     __slots__ = [
+        "_dir", "basename",
+        "atime_ns", "ctime_ns", "mtime_ns", "size_on_disk",
+        "digests", "fingerprint",
+    ]
+    init_mode = 1
+
+    #: the attributes in :meth:`WinFile.to_dict` and ``repr``, in order.
+    _attrs = [
         "abspath", "dirname", "basename", "fname", "ext",
-        "atime", "ctime", "mtime", "size_on_disk", "md5",
+        "atime", "ctime", "mtime", "size_on_disk", "digests", "fingerprint",
     ]
-    init_mode = 2
 
-    def __init__(self, abspath):
-        if os.path.isfile(abspath):  # 确保这是一个文件而不是目录
+    def __init__(self, abspath, detail=None):
+        try:
+            stat_result = os.stat(abspath)
+        except OSError:
+            stat_result = None
+
+        # 确保这是一个文件而不是目录
+        if (stat_result is not None) and stat.S_ISREG(stat_result.st_mode):
             self.abspath = os.path.abspath(abspath)
-            self.initialize()
+            # 已经读取了 stat, 在任何 detail 下都保存, 之后无需再次访问磁盘
+            self._load_stat(stat_result)
+            self.initialize(stat_result, detail)
         else:
             raise EnvironmentError(
                 "%s is not a file or it doesn't exist." % abspath)
 
-    def initialize(self):
+    def initialize(self, stat_result=None, detail=None):
         """Internal method. Initialize the value of some attributes.
+
+        :param stat_result: the ``os.stat`` result of this file, optional.
+        :param detail: 1, 2 or 3, which attributes are loaded eagerly, see
+          :meth:`WinFile.set_initialize_mode`. Default is
+          :attr:`WinFile.init_mode`.
+        """
+        if detail is None:
+            detail = self.init_mode
+
+        if detail == 1:
+            self.level1_initialize(stat_result)
+        elif detail == 2:
+            self.level2_initialize(stat_result)
+        elif detail == 3:
+            self.level3_initialize(stat_result)
+        else:
+            raise ValueError("detail has to be 3, 2 or 1.")
+
+    def __getattr__(self, attr):
+        """Only called when the slot is not set yet. Compute the attribute on
+        demand, and cache it in the slot.
+        """
+        if attr in ("size_on_disk", "atime_ns", "ctime_ns", "mtime_ns"):
+            self._load_stat()
+        elif attr == "digests":
+            self.digests = dict()
+        elif attr == "fingerprint":
+            self.fingerprint = fingerprint(self.abspath)
+        else:
+            raise AttributeError(
+                "'WinFile' object has no attribute '%s'" % attr)
+        return object.__getattribute__(self, attr)
+
+    @property
+    def abspath(self):
+        return os.path.join(self._dir.path, self.basename)
+
+    @abspath.setter
+    def abspath(self, value):
+        dirname, self.basename = os.path.split(value)
+        self._dir = _intern_dir(dirname)
+
+    @property
+    def dirname(self):
+        return self._dir.path
+
+    @dirname.setter
+    def dirname(self, value):
+        self._dir = _intern_dir(value)
+
+    @property
+    def fname(self):
+        return os.path.splitext(self.basename)[0]
+
+    @fname.setter
+    def fname(self, value):
+        self.basename = value + os.path.splitext(self.basename)[1]
+
+    @property
+    def ext(self):
+        return os.path.splitext(self.basename)[1].lower()
+
+    @ext.setter
+    def ext(self, value):
+        self.basename = os.path.splitext(self.basename)[0] + value
+
+    @property
+    def atime(self):
+        return ns_to_datetime(self.atime_ns)
+
+    @property
+    def ctime(self):
+        return ns_to_datetime(self.ctime_ns)
+
+    @property
+    def mtime(self):
+        return ns_to_datetime(self.mtime_ns)
+
+    @property
+    def md5(self):
+        """md5 value, an alias of ``self.digests["md5"]``.
         """
-        self.level2_initialize()
+        return self.load_digests(("md5", ))["md5"]
+
+    @md5.setter
+    def md5(self, value):
+        self.digests["md5"] = value
+
+    def load_digests(self, algorithms=("md5", ), cache=None):
+        """Compute the digests of this file with many ``hashlib`` algorithms
+        in a single read pass, already computed ones are reused. They are
+        stored in ``self.digests``.
+
+        :param cache: optional :class:`filetool.hashcache.HashCache`, looked
+          up before reading the file. The lazy ``self.md5`` attribute and the
+          detail 3 initialization don't use a cache.
+        :return: ``{algorithm: hexdigest}`` of the requested algorithms.
+
+        **中文文档**
+
+        只读取一次文件, 计算多种哈希值, 并保存在 ``self.digests`` 中。
+        """
+        missing = [algorithm for algorithm in algorithms
+                   if algorithm not in self.digests]
+        if missing:
+            if cache is not None:
+                self.digests.update(cache.hashfile(self.abspath, missing))
+            else:
+                self.digests.update(hashfile(self.abspath, missing))
+        return dict([(algorithm, self.digests[algorithm])
+                     for algorithm in algorithms])
+
+    @classmethod
+    def from_entry(cls, entry, detail=None):
+        """Create a :class:`WinFile` from a ``os.DirEntry``, reuse the file type
+        and the ``stat`` result cached by ``os.scandir``.
+
+        **中文文档**
+
+        从 ``os.scandir`` 返回的 ``DirEntry`` 创建WinFile, 利用其中缓存的文件
+        类型和 ``stat`` 结果, 避免重复访问磁盘。
+        """
+        if not entry.is_file():
+            raise EnvironmentError(
+                "%s is not a file or it doesn't exist." % entry.path)
+        if detail is None:
+            detail = cls.init_mode
+
+        if detail >= 2:
+            return cls.from_stat(entry.path, entry.stat(), detail)
+        else:  # file name only, don't stat
+            winfile = cls.__new__(cls)
+            winfile.abspath = entry.path
+            winfile.initialize(None, detail)
+            return winfile
+
+    @classmethod
+    def from_stat(cls, abspath, stat_result, detail=None):
+        """Create a :class:`WinFile` from an absolute path and its
+        ``os.stat_result``. All attributes are filled from ``stat_result``,
+        no more ``stat`` call will be made.
+
+        **中文文档**
+
+        使用已知的 ``os.stat`` 结果创建WinFile, 不会再次访问磁盘获取文件信息。
+        """
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise EnvironmentError(
+                "%s is not a file or it doesn't exist." % abspath)
+        winfile = cls.__new__(cls)
+        winfile.abspath = os.path.abspath(abspath)
+        winfile.initialize(stat_result, detail)
+        return winfile
 
     @staticmethod
     def use_fast_init():
-        """Set initialization mode to level1_initialize
+        """Set default initialization mode to level1_initialize
         """
-        WinFile.initialize = WinFile.level1_initialize
-        WinFile.init_mode = 1
+        WinFile.set_initialize_mode(complexity=1)
 
     @staticmethod
     def use_regular_init():
-        """Set initialization mode to level2_initialize
+        """Set default initialization mode to level2_initialize
         """
-        WinFile.initialize = WinFile.level2_initialize
-        WinFile.init_mode = 2
+        WinFile.set_initialize_mode(complexity=2)
 
     @staticmethod
     def use_slow_init():
-        """Set initialization mode to level3_initialize
+        """Set default initialization mode to level3_initialize
         """
-        WinFile.initialize = WinFile.level3_initialize
-        WinFile.init_mode = 3
+        WinFile.set_initialize_mode(complexity=3)
 
     @staticmethod
-    def set_initialize_mode(complexity=2):
-        """Set initialization mode. Default is slow mode.
+    def set_initialize_mode(complexity=1):
+        """Set default initialization mode. Default is fast mode. It only
+        decides which attributes are loaded eagerly, the others are still
+        available, they are computed on first access.
 
         - 1: fast mode, only file name relative
         - 2: regular mode, atime, ctime, mtime, size_on_disk
         - 3: slow mode, md5 checksum
 
+        This is a process wide setting, it is used when no ``detail`` argument
+        is given. To run scans with different detail level concurrently, pass
+        ``detail`` to each call instead, for example
+        ``FileCollection.from_path(dir_path, detail=2)``.
+
         **中文文档**
 
-        设置WinFile类的全局变量, 指定WinFile.initialize方法所绑定的初始化方式。
-        """
-        if complexity == 3:
-            WinFile.initialize = WinFile.level3_initialize
-            WinFile.init_mode = 3
-        elif complexity == 2:
-            WinFile.initialize = WinFile.level2_initialize
-            WinFile.init_mode = 2
-        elif complexity == 1:
-            WinFile.initialize = WinFile.level1_initialize
-            WinFile.init_mode = 1
+        设置WinFile类的全局默认初始化方式。这是一个全局设置, 在多线程中同时进行
+        不同精细程度的扫描时, 请在每次调用时使用 ``detail`` 参数指定。
+        """
+        if complexity in (1, 2, 3):
+            WinFile.init_mode = complexity
         else:
             raise ValueError("complexity has to be 3, 2 or 1.")
 
-    def level3_initialize(self):
+    def _load_stat(self, stat_result=None):
+        """Fill size_on_disk, atime_ns, ctime_ns, mtime_ns from one
+        ``os.stat`` call.
+        """
+        if stat_result is None:
+            stat_result = os.stat(self.abspath)
+
+        self.size_on_disk = stat_result.st_size
+
+        try:
+            # 最后一次接触(打开, 调用)的时间
+            self.atime_ns = stat_result.st_atime_ns
+
+            # 创建时间, 当文件被修改后不变
+            self.ctime_ns = stat_result.st_ctime_ns
+
+            # 最后一次修改的时间
+            self.mtime_ns = stat_result.st_mtime_ns
+        except AttributeError:  # python2
+            self.atime_ns = _time_ns(stat_result, "st_atime")
+            self.ctime_ns = _time_ns(stat_result, "st_ctime")
+            self.mtime_ns = _time_ns(stat_result, "st_mtime")
+
+    def level3_initialize(self, stat_result=None):
         """Load abspath, dirname, basename, fname, ext, atime, ctime, mtime,
         size_on_disk attributes in initialization.
 
+        :param stat_result: the ``os.stat`` result of this file, if not given,
+          call ``os.stat`` once.
+
         **中文文档**
 
         比较全面但稍慢的WinFile对象初始化方法, 从绝对路径中取得:
@@ -146,26 +502,16 @@ class WinFile(object):
         - 文件占据磁盘大小
         - 文件的哈希值
         """
-        self.dirname, self.basename = os.path.split(self.abspath)  # 目录名, 文件名
-        self.fname, self.ext = os.path.splitext(self.basename)  # 纯文件名, 文件扩展名
-        self.ext = self.ext.lower()
-
-        self.size_on_disk = os.path.getsize(self.abspath)
-
-        # 最后一次接触(打开, 调用)的时间
-        self.atime = datetime.fromtimestamp(os.path.getatime(self.abspath))
-
-        # 创建时间, 当文件被修改后不变
-        self.ctime = datetime.fromtimestamp(os.path.getctime(self.abspath))
-
-        # 最后一次修改的时间
-        self.mtime = datetime.fromtimestamp(os.path.getmtime(self.abspath))
+        self._load_stat(stat_result)
         self.md5 = md5file(self.abspath)  # 文件的哈希值
 
-    def level2_initialize(self):
+    def level2_initialize(self, stat_result=None):
         """Load abspath, dirname, basename, fname, ext, atime, ctime, mtime,
         size_on_disk attributes in initialization.
 
+        :param stat_result: the ``os.stat`` result of this file, if not given,
+          call ``os.stat`` once.
+
         **中文文档**
 
         比较全面但稍慢的WinFile对象初始化方法, 从绝对路径中取得:
@@ -180,28 +526,15 @@ class WinFile(object):
         - modify time
         - 文件占据磁盘大小
         """
-        self.dirname, self.basename = os.path.split(self.abspath)  # 目录名, 文件名
-        self.fname, self.ext = os.path.splitext(self.basename)  # 纯文件名, 文件扩展名
-        self.ext = self.ext.lower()
+        self._load_stat(stat_result)
 
-        self.size_on_disk = os.path.getsize(self.abspath)
-
-        # 最后一次接触(打开, 调用)的时间
-        self.atime = datetime.fromtimestamp(os.path.getatime(self.abspath))
-
-        # 创建时间, 当文件被修改后不变
-        self.ctime = datetime.fromtimestamp(os.path.getctime(self.abspath))
-
-        # 最后一次修改的时间
-        self.mtime = datetime.fromtimestamp(os.path.getmtime(self.abspath))
-
-    def level1_initialize(self):
+    def level1_initialize(self, stat_result=None):
         """Load abspath, dirname, basename, fname, ext
-        attributes in initialization.
+        attributes in initialization. It never touches the disk.
 
         **中文文档**
 
-        快速的WinFile对象初始化方法, 只从绝对路径中取得:
+        快速的WinFile对象初始化方法, 不访问磁盘, 只从绝对路径中取得:
 
         - 绝对路径
         - 目录路径
@@ -209,9 +542,7 @@ class WinFile(object):
         - 纯文件名
         - 文件扩展名
         """
-        self.dirname, self.basename = os.path.split(self.abspath)
-        self.fname, self.ext = os.path.splitext(self.basename)
-        self.ext = self.ext.lower()
+        # dirname, basename, fname, ext 在设置abspath时就已确定, 无需计算
 
     def __str__(self):
         return self.abspath
@@ -219,33 +550,41 @@ class WinFile(object):
     def __repr__(self):
         lines = list()
 
-        attr_name_length = list()
-        for attr in self.__slots__:
-            if hasattr(self, attr):
-                attr_name_length.append(len(attr))
-
-        template = "{0: <%s}= " % (max(attr_name_length) + 1, )
-        for attr in self.__slots__:
-            try:
-                line = "%s%r" % (template.format(attr), getattr(self, attr))
-                lines.append(line)
-            except:
-                pass
+        d = self.to_dict()  # don't trigger lazy loading
+        template = "{0: <%s}= " % (max([len(attr) for attr in d]) + 1, )
+        for attr in self._attrs:
+            if attr in d:
+                lines.append("%s%r" % (template.format(attr), d[attr]))
         info = ",\n    ".join(lines)
         return "WinFile(\n    %s,\n)" % info
 
     def __hash__(self):
         return hash(self.abspath)
 
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.abspath = state["abspath"]
+        for attr, value in state.items():
+            if (attr not in NAME_ATTRS) and (attr not in TIME_ATTRS):
+                setattr(self, attr, value)
+
     def to_dict(self):
-        """Convert :class:`WinFile` to dictionary.
+        """Convert :class:`WinFile` to dictionary. Only attributes already
+        loaded are included.
         """
         d = dict()
-        for attr in self.__slots__:
+        for attr in self._attrs:
             try:
+                if attr in TIME_ATTRS:  # 只有已经载入的时间才转换成datetime
+                    d[TIME_ATTRS[attr]] = self.__getattribute__(
+                        TIME_ATTRS[attr])
                 d[attr] = self.__getattribute__(attr)
             except AttributeError:
                 pass
+        if "md5" in d.get("digests", ()):
+            d["md5"] = d["digests"]["md5"]
         return d
 
     def update(self, new_dirname=None, new_fname=None, new_ext=None):
@@ -268,9 +607,7 @@ class WinFile(object):
 
         if new_ext:
             self.ext = new_ext
-
-        self.basename = self.fname + self.ext
-        self.abspath = os.path.join(self.dirname, self.basename)
+        # basename 和 abspath 由 dirname, fname, ext 的setter自动更新
 
     def copy(self):
         """Create a copy of this :class:`WinFile` instance.
@@ -322,12 +659,8 @@ class WinFile(object):
 
         os.rename(self.abspath, new_abspath)
 
-        # 如果成功重命名, 则更新文件信息
+        # 如果成功重命名, 则更新文件信息, dirname, fname, ext 会随之更新
         self.abspath = new_abspath
-        self.dirname = new_dirname
-        self.basename = new_basename
-        self.fname = new_fname
-        self.ext = new_ext
 
     #--- Boolean method ---
     def isfile(self):
@@ -401,19 +734,20 @@ class WinDir(object):
         self.num_folder_current = 0
         self.num_file_current = 0
 
-        for current_dir, folderlist, fnamelist in os.walk(self.abspath):
-            self.num_folder_total += len(folderlist)
-            self.num_file_total += len(fnamelist)
-            for fname in fnamelist:
-                self.size_total += os.path.getsize(
-                    os.path.join(current_dir, fname))
+        for current_dir, dir_entries, file_entries in \
+                walker.walk(self.abspath):
+            size = 0
+            for entry in file_entries:
+                size += entry.stat().st_size
+
+            self.num_folder_total += len(dir_entries)
+            self.num_file_total += len(file_entries)
+            self.size_total += size
 
-        current_dir, folderlist, fnamelist = next(os.walk(self.abspath))
-        self.num_folder_current = len(folderlist)
-        self.num_file_current = len(fnamelist)
-        for fname in fnamelist:
-            self.size_current += os.path.getsize(
-                os.path.join(current_dir, fname))
+            if current_dir == self.abspath:
+                self.num_folder_current = len(dir_entries)
+                self.num_file_current = len(file_entries)
+                self.size_current = size
 
     def __str__(self):
         return self.abspath
@@ -472,19 +806,32 @@ class FileCollection(object):
 
     Simplify file selection, removing, filtering, sorting operations.
 
+    Add and remove files with :meth:`FileCollection.add`,
+    :meth:`FileCollection.remove` or the set operators, they keep the sort
+    order, the sort cache and the secondary indexes in sync. After editing
+    :attr:`FileCollection.files` directly, call
+    :meth:`FileCollection.invalidate`.
+
     **中文文档**
 
     WinFile的专用容器, 主要用于方便的从文件夹中选取文件, 筛选文件, 并对指定文件集排序。
     当然, 可以以迭代器的方式对容器内的文件对象进行访问。
+
+    请使用 add, remove 或集合运算添加删除文件; 如果直接修改了 ``self.files``,
+    需要调用 ``invalidate()``。
     """
 
-    def __init__(self, path_or_path_list=list()):
+    def __init__(self, path_or_path_list=list(), detail=None):
         self.files = OrderedDict()  # {文件绝对路径: 包含各种详细信息的WinFile对象}
+        self._index = None  # 按当前顺序排列的文件绝对路径tuple, 用于按位置访问
+        self._version = 0  # 每次添加, 删除文件后加1
+        self._sort_cache = dict()  # {排序键: (version, 排序后的路径tuple)}
+        self._file_index = None  # 二级索引, 在第一次查询时建立
 
         path_or_path_list = self._preprocess(path_or_path_list)
 
         for abspath in path_or_path_list:
-            winfile = WinFile(abspath)
+            winfile = WinFile(abspath, detail)
             self.files[winfile.abspath] = winfile
 
     @staticmethod
@@ -516,74 +863,178 @@ class FileCollection(object):
     def __str__(self):
         if len(self.files) == 0:
             return "*** Empty FileCollection ***"
-        try:
-            return "\n".join(
-                ["*** File Collection ***", ] + list(self.order))
-        except:
-            return "\n".join(
-                ["*** File Collection ***", ] + list(self.files.keys()))
+        return "\n".join(("*** File Collection ***", ) + self._paths())
 
     def __len__(self):
         return len(self.files)
 
     def __getitem__(self, index):
-        """Get the ``index``th winfile.
+        """Get the ``index``th winfile, in O(1). A slice returns a new
+        FileCollection of the selected files, in the same order, sharing the
+        WinFile objects::
+
+            fc.sort_by("mtime", reverse=True)
+            newest = fc[0]
+            page2 = fc[100:200]
+
+        **中文文档**
+
+        按位置获取WinFile, 顺序与最后一次 ``sort_by`` 相同。使用切片时返回一个
+        新的FileCollection。
         """
-        try:
-            return self.files[self.order[index]]
-        except:
-            index += 1
-            for winfile in self.iterfiles():
-                index -= 1
-                if not index:
-                    return winfile
+        paths = self._paths()
+        if isinstance(index, slice):
+            files = self.files
+            return self._from_files(OrderedDict(
+                (abspath, files[abspath]) for abspath in paths[index]))
+        return self.files[paths[index]]
 
-    def __contains__(self, item):
-        """Test if winfile in this file collection.
+    def __reversed__(self):
+        return self.iterpaths(reverse=True)
+
+    def _paths(self):
+        """The tuple of all file absolute path in the current order, the
+        order of the last :meth:`FileCollection.sort_by`, or the insertion
+        order. It is built once and reused until files are added or removed,
+        it is immutable so it can be shared.
+        """
+        index = self._index
+        if (index is None) or (len(index) != len(self.files)):
+            # 直接修改了 self.files 而没有调用 invalidate(), 回到插入顺序
+            index = self._index = tuple(self.files)
+        return index
+
+    @property
+    def order(self):
+        """A new list of all file absolute path in the current order, see
+        :meth:`FileCollection._paths`. Changing it doesn't change the
+        collection, assign it to reorder the files.
+
+        **中文文档**
+
+        按当前顺序排列的所有文件的绝对路径, 返回的是一个新的列表。
+        """
+        return list(self._paths())
+
+    @order.setter
+    def order(self, abspath_list):
+        abspath_list = tuple(abspath_list)
+        if (len(abspath_list) != len(self.files)) or \
+                (set(abspath_list) != set(self.files)):
+            raise ValueError("order has to be a permutation of the files.")
+        self._index = abspath_list
+
+    def _reset_order(self):
+        """Drop the order of the last ``sort_by``, it is stale once files are
+        added or removed, and bump the version, see
+        :meth:`FileCollection.sort_by`.
+        """
+        self._index = None
+        self._version += 1
+        self._sort_cache.clear()  # 过期的排序结果不再需要, 释放内存
+
+    def invalidate(self):
+        """Drop the sort order, the sort cache and the secondary indexes.
+        Call it after editing :attr:`FileCollection.files` directly.
+
+        **中文文档**
+
+        直接修改 ``self.files`` 之后, 需要调用此方法使排序和索引失效。
         """
-        if isinstance(item, str):  # abspath
-            abspath = os.path.abspath(item)
-        elif isinstance(item, WinFile):  # WinFile
-            abspath = item.abspath
+        self._reset_order()
+        self._file_index = None
+
+    @staticmethod
+    def _key(abspath_or_winfile):
+        """Normalize a path or WinFile to the key of :attr:`FileCollection.files`,
+        without touching the file system.
+        """
+        if isinstance(abspath_or_winfile, WinFile):
+            return abspath_or_winfile.abspath
+        elif isinstance(abspath_or_winfile, str_type):
+            return os.path.abspath(abspath_or_winfile)
         else:  # invalid type
             raise TypeError
 
-        if abspath in self.files:
+    def __contains__(self, item):
+        """Test if winfile in this file collection. It is a dict lookup, the
+        file system is not accessed.
+        """
+        if isinstance(item, str_type) and (item in self.files):  # 已经是规范路径
             return True
-        else:
-            return False
+        return self._key(item) in self.files
+
+    def contains_many(self, abspath_or_winfile_list):
+        """Test many path or WinFile at once, return a list of boolean.
+
+        **中文文档**
+
+        批量判断多个路径或WinFile是否在集合中, 不访问磁盘。
+        """
+        files, key = self.files, self._key
+        return [
+            (item in files) or (key(item) in files)
+            if isinstance(item, str_type) else key(item) in files
+            for item in abspath_or_winfile_list
+        ]
 
     def add(self, abspath_or_winfile, enable_verbose=True):
-        """Add absolute path or WinFile to FileCollection.
+        """Add absolute path or WinFile to FileCollection. A path is only
+        ``stat``'ed when it is not in the collection yet.
         """
-        if isinstance(abspath_or_winfile, str_type):
-            winfile = WinFile(abspath_or_winfile)
-        elif isinstance(abspath_or_winfile, WinFile):
+        abspath = self._key(abspath_or_winfile)
+        if abspath in self.files:
+            prt("'%s' already in this collections" % abspath, enable_verbose)
+            return
+
+        if isinstance(abspath_or_winfile, WinFile):
             winfile = abspath_or_winfile
         else:
-            raise TypeError
+            winfile = WinFile(abspath)
+        self.files[abspath] = winfile
+        if self._file_index is not None:
+            self._file_index.add(abspath, winfile)
+        self._reset_order()
 
-        if winfile.abspath in self.files:
-            prt("'%s' already in this collections" % winfile, enable_verbose)
-        else:
-            self.files.setdefault(winfile.abspath, winfile)
+    def add_many(self, abspath_or_winfile_list, enable_verbose=False):
+        """Add many path or WinFile, return the number of added files.
 
-    def remove(self, abspath_or_winfile, enable_verbose=True):
-        """Remove absolute path or WinFile from FileCollection.
+        **中文文档**
+
+        批量添加文件, 已经存在的文件不会访问磁盘。返回新添加的文件数量。
         """
-        if isinstance(abspath_or_winfile, str_type):
-            winfile = WinFile(abspath_or_winfile)
-        elif isinstance(abspath_or_winfile, WinFile):
-            winfile = abspath_or_winfile
-        else:
-            raise TypeError
+        n = len(self.files)
+        for abspath_or_winfile in abspath_or_winfile_list:
+            self.add(abspath_or_winfile, enable_verbose)
+        return len(self.files) - n
 
+    def remove(self, abspath_or_winfile, enable_verbose=True):
+        """Remove absolute path or WinFile from FileCollection, the file
+        system is not accessed.
+        """
+        abspath = self._key(abspath_or_winfile)
         try:
-            del self.files[winfile.abspath]
+            winfile = self.files.pop(abspath)
         except KeyError:
             if enable_verbose:
-                prt("'%s' are not in this file collections" % winfile,
+                prt("'%s' are not in this file collections" % abspath,
                     enable_verbose)
+        else:
+            if self._file_index is not None:
+                self._file_index.remove(abspath, winfile)
+            self._reset_order()
+
+    def remove_many(self, abspath_or_winfile_list, enable_verbose=False):
+        """Remove many path or WinFile, return the number of removed files.
+
+        **中文文档**
+
+        批量删除文件, 不访问磁盘。返回被删除的文件数量。
+        """
+        n = len(self.files)
+        for abspath_or_winfile in abspath_or_winfile_list:
+            self.remove(abspath_or_winfile, enable_verbose)
+        return n - len(self.files)
 
     @property
     def howmany(self):
@@ -591,25 +1042,19 @@ class FileCollection(object):
         """
         return len(self.files)
 
-    def iterfiles(self):
-        """Yield all WinFile object.
+    def iterfiles(self, reverse=False):
+        """Yield all WinFile object, in :attr:`FileCollection.order`.
         """
-        try:
-            for path in self.order:
-                yield self.files[path]
-        except:
-            for winfile in self.files.values():
-                yield winfile
+        files = self.files
+        for path in self.iterpaths(reverse=reverse):
+            yield files[path]
 
-    def iterpaths(self):
-        """Yield all WinFile's absolute path.
+    def iterpaths(self, reverse=False):
+        """Yield all WinFile's absolute path, in :attr:`FileCollection.order`.
         """
-        try:
-            for path in self.order:
-                yield path
-        except:
-            for path in self.files:
-                yield path
+        if reverse:
+            return reversed(self._paths())
+        return iter(self._paths())
 
     def __iter__(self):
         """Default iterator is to yield absolute paht only.
@@ -624,25 +1069,55 @@ class FileCollection(object):
 
         遍历path目录下的所有文件, 返回绝对路径。
         """
+        for entry in FileCollection.yield_all_file_entry(dir_abspath):
+            yield entry.path
+
+    @staticmethod
+    def yield_all_file_entry(dir_abspath, recursive=True):
+        """``os.DirEntry`` iterator of all files, the underlying walk engine of
+        all ``yield_all_*file*`` methods.
+
+        **中文文档**
+
+        遍历path目录下的所有文件, 返回 ``os.scandir`` 的 ``DirEntry`` 对象。
+        """
         if os.path.isdir(dir_abspath):
             dir_abspath = os.path.abspath(dir_abspath)
-            for current_folder, _, fnamelist in os.walk(dir_abspath):
-                for fname in fnamelist:
-                    yield os.path.join(current_folder, fname)
+            for entry in walker.iter_file_entries(
+                    dir_abspath, recursive=recursive):
+                yield entry
         else:
             raise EnvironmentError(
                 "'%s' may not exists or is not a directory!" % dir_abspath)
 
     @staticmethod
-    def yield_all_winfile(dir_abspath):
+    def yield_all_winfile(dir_abspath, detail=None, workers=None):
         """WinFile instance iterator.
 
+        :param workers: if greater than 1, list directories and create WinFile
+          in this many threads, see :func:`filetool.walker.parallel_walk`.
+          The order of files is the same.
+
         **中文文档**
 
         遍历path目录下的所有文件, 返回WinFile。
         """
-        for abspath in FileCollection.yield_all_file_path(dir_abspath):
-            yield WinFile(abspath)
+        if workers and workers > 1:
+            if not os.path.isdir(dir_abspath):
+                raise EnvironmentError(
+                    "'%s' may not exists or is not a directory!" % dir_abspath)
+
+            def file_func(entry):
+                return WinFile.from_entry(entry, detail)
+
+            for _, _, winfile_list in walker.parallel_walk(
+                    os.path.abspath(dir_abspath), workers=workers,
+                    file_func=file_func):
+                for winfile in winfile_list:
+                    yield winfile
+        else:
+            for entry in FileCollection.yield_all_file_entry(dir_abspath):
+                yield WinFile.from_entry(entry, detail)
 
     @staticmethod
     def yield_all_top_file_path(dir_abspath):
@@ -652,26 +1127,21 @@ class FileCollection(object):
 
         遍历path目录下的所有文件, 不包括子文件夹中的文件, 返回绝对路径。
         """
-        if os.path.isdir(dir_abspath):
-            dir_abspath = os.path.abspath(dir_abspath)
-            for current_folder, _, fnamelist in os.walk(dir_abspath):
-                for fname in fnamelist:
-                    yield os.path.join(current_folder, fname)
-                break
-        else:
-            raise EnvironmentError(
-                "'%s' may not exists or is not a directory!" % dir_abspath)
+        for entry in FileCollection.yield_all_file_entry(
+                dir_abspath, recursive=False):
+            yield entry.path
 
     @staticmethod
-    def yield_all_top_winfile(dir_abspath):
+    def yield_all_top_winfile(dir_abspath, detail=None):
         """WinFile instance iterator, except file in subfolder.
 
         **中文文档**
 
         遍历path目录下的所有文件, 不包括子文件夹中的文件, 返回WinFile。
         """
-        for abspath in FileCollection.yield_all_top_file_path(dir_abspath):
-            yield WinFile(abspath)
+        for entry in FileCollection.yield_all_file_entry(
+                dir_abspath, recursive=False):
+            yield WinFile.from_entry(entry, detail)
 
     @staticmethod
     def yield_all_dir_path(dir_abspath):
@@ -682,9 +1152,8 @@ class FileCollection(object):
         遍历dir_abspath目录下的所有子目录, 返回绝对路径。
         """
         if os.path.isdir(dir_abspath):
-            for current_folder, folderlist, _ in os.walk(dir_abspath):
-                for folder in folderlist:
-                    yield os.path.join(current_folder, folder)
+            for entry in walker.iter_dir_entries(dir_abspath):
+                yield entry.path
         else:
             raise Exception(
                 "'%s' may not exists or is not a directory!" % dir_abspath)
@@ -709,10 +1178,8 @@ class FileCollection(object):
         遍历dir_abspath目录下的所有子目录, 不包括子目录中的子目录, 返回绝对路径。
         """
         if os.path.isdir(dir_abspath):
-            for current_folder, folderlist, _ in os.walk(dir_abspath):
-                for folder in folderlist:
-                    yield os.path.join(current_folder, folder)
-                break
+            for entry in walker.iter_dir_entries(dir_abspath, recursive=False):
+                yield entry.path
         else:
             raise Exception(
                 "'%s' may not exists or is not a directory!" % dir_abspath)
@@ -729,11 +1196,20 @@ class FileCollection(object):
             yield WinDir(abspath)
 
     @staticmethod
-    def from_path(path_or_path_list):
+    def from_path(path_or_path_list, detail=None, workers=None, cache=None):
         """Create a new FileCollection and add all files from ``dir_path``.
 
         :param path_or_path_list: absolute dir path, WinDir instance, list of
           absolute dir path or list of WinDir instance.
+        :param detail: 1, 2 or 3, which WinFile attributes are loaded eagerly
+          during the scan, see :meth:`WinFile.set_initialize_mode`.
+        :param workers: number of threads used to walk the directory tree,
+          useful on high latency network file systems. Default is a single
+          threaded walk. The result is the same. With ``detail=3``, it is also
+          the size of the hashing thread pool, see
+          :meth:`FileCollection.load_md5`.
+        :param cache: optional :class:`filetool.hashcache.HashCache` used by
+          ``detail=3``, unchanged files are not read again.
 
         **中文文档**
 
@@ -741,18 +1217,27 @@ class FileCollection(object):
         """
         path_or_path_list = FileCollection._preprocess(path_or_path_list)
 
+        if detail is None:
+            detail = WinFile.init_mode
+
         fc = FileCollection()
         for dir_path in path_or_path_list:
-            for winfile in FileCollection.yield_all_winfile(dir_path):
+            for winfile in FileCollection.yield_all_winfile(
+                    dir_path, 2 if detail == 3 else detail, workers):
                 fc.files.setdefault(winfile.abspath, winfile)
+
+        if detail == 3:  # 并行计算md5, 而不是在遍历时逐个计算
+            fc.load_md5(workers=workers, cache=cache)
         return fc
 
     @staticmethod
-    def from_path_by_criterion(path_or_path_list, criterion, keepboth=False):
+    def from_path_by_criterion(path_or_path_list, criterion, keepboth=False,
+                               detail=None):
         """Create a new FileCollection, and select some files from ``dir_path``.
 
         How to construct your own criterion function::
 
+            @requires("ext")
             def filter_image(winfile):
                 if winfile.ext in [".jpg", ".png", ".bmp"]:
                     return True
@@ -768,19 +1253,48 @@ class FileCollection(object):
         :param keepboth: if True, returns two file collections, one is files
             with criterion=True, another is False.
         :type keepboth: boolean
+        :param detail: 1, 2 or 3, which WinFile attributes are loaded eagerly
+          during the scan, see :meth:`WinFile.set_initialize_mode`.
+
+        If the criterion declares the attributes it reads with
+        :func:`requires`, and they are all file name attributes, it is
+        evaluated before the file is ``stat``'ed, and only the selected files
+        are loaded with ``detail``. All :class:`FileFilter` methods do so.
 
         **中文文档**
 
         直接选取dir_path目录下所有文件, 根据criterion中的规则, 生成
-        FileCollection。
+        FileCollection。如果criterion使用 :func:`requires` 声明了只需要文件名
+        相关的属性, 那么只有被选中的文件才会访问磁盘。
         """
         path_or_path_list = FileCollection._preprocess(path_or_path_list)
 
+        if detail is None:
+            detail = WinFile.init_mode
+        required_detail = _required_detail(criterion)
+
+        def iter_evaluated(dir_path):
+            """Yield ``(winfile, criterion(winfile))``.
+            """
+            if required_detail is None:  # 不知道需要哪些属性
+                for winfile in FileCollection.yield_all_winfile(
+                        dir_path, detail):
+                    yield winfile, criterion(winfile)
+                return
+
+            for entry in FileCollection.yield_all_file_entry(dir_path):
+                winfile = WinFile.from_entry(entry, required_detail)
+                flag = criterion(winfile)
+                # 只对需要的文件进行完整的初始化
+                if (flag or keepboth) and (detail > required_detail):
+                    winfile.initialize(entry.stat(), detail)
+                yield winfile, flag
+
         if keepboth:
             fc_yes, fc_no = FileCollection(), FileCollection()
             for dir_path in path_or_path_list:
-                for winfile in FileCollection.yield_all_winfile(dir_path):
-                    if criterion(winfile):
+                for winfile, flag in iter_evaluated(dir_path):
+                    if flag:
                         fc_yes.files.setdefault(winfile.abspath, winfile)
                     else:
                         fc_no.files.setdefault(winfile.abspath, winfile)
@@ -788,14 +1302,15 @@ class FileCollection(object):
         else:
             fc = FileCollection()
             for dir_path in path_or_path_list:
-                for winfile in FileCollection.yield_all_winfile(dir_path):
-                    if criterion(winfile):
+                for winfile, flag in iter_evaluated(dir_path):
+                    if flag:
                         fc.files.setdefault(winfile.abspath, winfile)
             return fc
 
     @staticmethod
     def from_path_except(path_or_path_list,
-                         ignore=None, ignore_ext=None, ignore_pattern=None):
+                         ignore=None, ignore_ext=None, ignore_pattern=None,
+                         detail=None, rules=None):
         """Create a new FileCollection, and select all files except file
         matching ignore-rule::
 
@@ -810,62 +1325,77 @@ class FileCollection(object):
         :param ignore_ext: file with extensions defined in this list will be ignored.
         :param ignore_pattern: any file or directory that contains this pattern
           will be ignored.
+        :param detail: 1, 2 or 3, which WinFile attributes are loaded eagerly
+          during the scan, see :meth:`WinFile.set_initialize_mode`.
+        :param rules: optional, gitignore style rules, a
+          :class:`filetool.rules.RuleSet`, a list of ``.gitignore`` lines, or
+          the text of a ``.gitignore`` file. Files matching them are ignored
+          as well::
+
+            fc = FileCollection.from_path_except(
+                dir_path, rules=[".git/", "*.pyc", "!keep.pyc"])
+
+        A directory is never descended into if all files under it are
+        ignored, for example ``ignore=[".git"]`` or
+        ``ignore_pattern=["node_modules"]``. The result is exactly the same
+        as filtering every file.
 
         **中文文档**
 
         选择dir_path下的所有文件, 在ignore, ignore_ext, ignore_pattern中所定义
-        的文件将被排除在外。
+        的文件将被排除在外。被忽略的目录在遍历时就会被跳过, 不会进入其中。
         """
-        if ignore is None:
-            ignore = list()
-        elif isinstance(ignore, str_type):
+        if isinstance(ignore, str_type):
             ignore = [ignore, ]
-
-        if ignore_ext is None:
-            ignore_ext = list()
-        elif isinstance(ignore_ext, str_type):
+        if isinstance(ignore_ext, str_type):
             ignore_ext = [ignore_ext, ]
-
-        if ignore_pattern is None:
-            ignore_pattern = list()
-        elif isinstance(ignore_pattern, str_type):
+        if isinstance(ignore_pattern, str_type):
             ignore_pattern = [ignore_pattern, ]
 
-        path_or_path_list = FileCollection._preprocess(path_or_path_list)
+        # 所有规则被编译成少数几个正则表达式
+        rule_set_list = list()
+        if ignore or ignore_ext or ignore_pattern:
+            rule_set_list.append(
+                RuleSet.from_ignore_list(ignore, ignore_ext, ignore_pattern))
+        if rules is not None:
+            if not isinstance(rules, RuleSet):
+                rules = RuleSet(rules)
+            rule_set_list.append(rules)
+
+        def is_ignored(relpath, is_dir):
+            for rule_set in rule_set_list:
+                if rule_set.match(relpath, is_dir):
+                    return True
+            return False
 
-        ignore = [i.lower() for i in ignore]
-        ignore_ext = [i.lower() for i in ignore_ext]
-        ignore_pattern = [i.lower() for i in ignore_pattern]
+        path_or_path_list = FileCollection._preprocess(path_or_path_list)
 
         fc = FileCollection()
         for dir_path in path_or_path_list:
-            def filter(winfile):
-                relpath = os.path.relpath(winfile.abspath, dir_path).lower()
-
-                # exclude ignore
-                for path in ignore:
-                    if relpath.startswith(path):
-                        return False
-
-                # exclude ignore extension
-                if winfile.ext in ignore_ext:
-                    return False
-
-                # exclude ignore pattern
-                for pattern in ignore_pattern:
-                    if pattern in relpath:
-                        return False
-
-                return True
-
-            for winfile in FileCollection.yield_all_winfile(dir_path):
-                if filter(winfile):
+            if not os.path.isdir(dir_path):
+                raise EnvironmentError(
+                    "'%s' may not exists or is not a directory!" % dir_path)
+            dir_path = os.path.abspath(dir_path)
+            prefix_length = len(os.path.join(dir_path, ""))
+
+            for _, dir_entries, file_entries in walker.walk(dir_path):
+                # 被忽略的目录下的所有文件都会被忽略, 所以无需进入该目录
+                dir_entries[:] = [
+                    entry for entry in dir_entries
+                    if not is_ignored(entry.path[prefix_length:], True)
+                ]
+
+                # 只根据文件名进行筛选, 只为留下的文件创建WinFile
+                for entry in file_entries:
+                    if is_ignored(entry.path[prefix_length:], False):
+                        continue
+                    winfile = WinFile.from_entry(entry, detail)
                     fc.files.setdefault(winfile.abspath, winfile)
 
         return fc
 
     @staticmethod
-    def from_path_by_pattern(path_or_path_list, pattern=None):
+    def from_path_by_pattern(path_or_path_list, pattern=None, detail=None):
         """Create a new FileCollection, and select all files except file
         matching ignore-rule::
 
@@ -877,6 +1407,8 @@ class FileCollection(object):
           absolute dir path or list of WinDir instance.
         :param pattern: any file or directory that contains this pattern
           will be selected.
+        :param detail: 1, 2 or 3, which WinFile attributes are loaded eagerly
+          during the scan, see :meth:`WinFile.set_initialize_mode`.
 
         **中文文档**
 
@@ -889,24 +1421,22 @@ class FileCollection(object):
 
         path_or_path_list = FileCollection._preprocess(path_or_path_list)
 
-        pattern = [i.lower() for i in pattern]
+        rule_set = RuleSet(ignore_case=True)
+        for p in pattern:
+            rule_set.add_substring(p)
 
         fc = FileCollection()
         for dir_path in path_or_path_list:
-            def filter(winfile):
-                relpath = os.path.relpath(winfile.abspath, dir_path).lower()
-                for p in pattern:
-                    if p in relpath:
-                        return True
-                return False
-
-            for winfile in FileCollection.yield_all_winfile(dir_path):
-                if filter(winfile):
+            prefix_length = len(os.path.join(os.path.abspath(dir_path), ""))
+            for entry in FileCollection.yield_all_file_entry(dir_path):
+                if rule_set.match(entry.path[prefix_length:]):
+                    winfile = WinFile.from_entry(entry, detail)
                     fc.files.setdefault(winfile.abspath, winfile)
         return fc
 
     @staticmethod
-    def from_path_by_size(path_or_path_list, min_size=0, max_size=1 << 40):
+    def from_path_by_size(path_or_path_list, min_size=0, max_size=1 << 40,
+                          detail=None):
         """Create a new FileCollection, and select all files that size in
         a range::
 
@@ -928,9 +1458,12 @@ class FileCollection(object):
           absolute dir path or list of WinDir instance.
         :param min_size: any file size greater than this value will return
         :param max_size: any file size less than this value will return
+        :param detail: 1, 2 or 3, which WinFile attributes are loaded eagerly
+          during the scan, see :meth:`WinFile.set_initialize_mode`.
         """
         path_or_path_list = FileCollection._preprocess(path_or_path_list)
 
+        @requires("size_on_disk")
         def filter(winfile):
             if (winfile.size_on_disk >= min_size) and \
                     (winfile.size_on_disk <= max_size):
@@ -939,10 +1472,57 @@ class FileCollection(object):
                 return False
 
         return FileCollection.from_path_by_criterion(
-            path_or_path_list, filter, keepboth=False)
+            path_or_path_list, filter, keepboth=False, detail=detail)
+
+    @staticmethod
+    def from_path_by_time(path_or_path_list, start=None, end=None,
+                          attr="mtime", detail=None):
+        """Create a new FileCollection, and select all files that time is in
+        a range::
+
+            # files modified in 2016
+            fc = FileCollection.from_path_by_time(
+                dir_path, start=datetime(2016, 1, 1), end=datetime(2017, 1, 1))
+
+        The range is converted to integer nanoseconds once, files are compared
+        by ``*time_ns``, no datetime is created.
+
+        :param path_or_path_list: absolute dir path, WinDir instance, list of
+          absolute dir path or list of WinDir instance.
+        :param start: ``datetime`` or nanoseconds since epoch, included, if
+          None, no lower bound.
+        :param end: ``datetime`` or nanoseconds since epoch, excluded, if
+          None, no upper bound.
+        :param attr: ``"mtime"``, ``"atime"`` or ``"ctime"``.
+        :param detail: 1, 2 or 3, which WinFile attributes are loaded eagerly
+          during the scan, see :meth:`WinFile.set_initialize_mode`.
+
+        **中文文档**
+
+        选择所有时间在 [start, end) 之间的文件。
+        """
+        if attr not in TIME_ATTRS:
+            raise ValueError("attr has to be 'mtime', 'atime' or 'ctime'.")
+        attr_ns = TIME_ATTRS[attr]
+        if isinstance(start, datetime):
+            start = datetime_to_ns(start)
+        if isinstance(end, datetime):
+            end = datetime_to_ns(end)
+
+        @requires(attr_ns)
+        def filter(winfile):
+            value = getattr(winfile, attr_ns)
+            if (start is not None) and (value < start):
+                return False
+            if (end is not None) and (value >= end):
+                return False
+            return True
+
+        return FileCollection.from_path_by_criterion(
+            path_or_path_list, filter, keepboth=False, detail=detail)
 
     @staticmethod
-    def from_path_by_ext(path_or_path_list, ext):
+    def from_path_by_ext(path_or_path_list, ext, detail=None):
         """Create a new FileCollection, and select all files that extension
         matching ``ext``::
 
@@ -953,16 +1533,20 @@ class FileCollection(object):
         :param path_or_path_list: absolute dir path, WinDir instance, list of
           absolute dir path or list of WinDir instance.
         :param ext: select file by extension
+        :param detail: 1, 2 or 3, which WinFile attributes are loaded eagerly
+          during the scan, see :meth:`WinFile.set_initialize_mode`.
         """
         path_or_path_list = FileCollection._preprocess(path_or_path_list)
 
         if isinstance(ext, (list, set, dict)):  # collection of extension
+            @requires("ext")
             def filter(winfile):
                 if winfile.ext in ext:
                     return True
                 else:
                     return False
         else:  # str
+            @requires("ext")
             def filter(winfile):
                 if winfile.ext == ext:
                     return True
@@ -970,52 +1554,386 @@ class FileCollection(object):
                     return False
 
         return FileCollection.from_path_by_criterion(
-            path_or_path_list, filter, keepboth=False)
+            path_or_path_list, filter, keepboth=False, detail=detail)
 
     @staticmethod
-    def from_path_by_md5(path_or_path_list, md5_value):
+    def from_path_by_md5(path_or_path_list, md5_value, detail=None,
+                         workers=None, executor="thread", cache=None,
+                         size_on_disk=None, head_md5=None,
+                         head_nbytes=hashing.HEAD_NBYTES):
         """Create a new FileCollection, and select all files' that md5 is
         matching.
 
+        If you know more about the file you are looking for, give its size and
+        the md5 of its first ``head_nbytes`` bytes. Files are then compared
+        stage by stage: size first (stat only), then the head md5, and the
+        full md5 is only computed for the few remaining candidates::
+
+            fc = FileCollection.from_path_by_md5(
+                dir_path, md5file(abspath),
+                size_on_disk=os.path.getsize(abspath),
+                head_md5=md5file(abspath, nbytes=HEAD_NBYTES))
+
+        If you have the file itself, use
+        :meth:`FileCollection.from_path_by_file`, which computes them. Without
+        ``size_on_disk``, the sizes a ``cache`` has seen for ``md5_value`` are
+        used for the size stage.
+
+        :param path_or_path_list: absolute dir path, WinDir instance, list of
+          absolute dir path or list of WinDir instance.
+        :param md5_value: the md5 hex digest to look for.
+        :param detail: 1, 2 or 3, which WinFile attributes are loaded eagerly
+          during the scan, see :meth:`WinFile.set_initialize_mode`.
+        :param workers: hashing pool size, see :meth:`FileCollection.load_md5`.
+        :param executor: ``"thread"`` or ``"process"``.
+        :param cache: optional :class:`filetool.hashcache.HashCache`.
+        :param size_on_disk: optional, size of the file to look for.
+        :param head_md5: optional, md5 of the first ``head_nbytes`` bytes of
+          the file to look for.
+        :param head_nbytes: see ``head_md5``.
+
         **中文文档**
 
         给定一个文件使用WinFile模块获得的md5值, 在list_of_dir中的文件里,
-        找到与之相同的文件。
+        找到与之相同的文件。如果同时给定文件大小, 以及文件头部的md5值, 则会依次
+        比较文件大小, 文件头部的md5, 最后只对剩下的少数文件计算完整的md5。
+        """
+        if detail is None:
+            detail = WinFile.init_mode
+
+        fc = FileCollection.from_path(
+            path_or_path_list, detail=2 if detail == 3 else detail)
+        candidates = list(fc.files.values())
+
+        # stage 1, size
+        if size_on_disk is not None:
+            sizes = set([size_on_disk, ])
+        elif cache is not None:
+            # 内容相同的文件大小相同, 缓存中md5相同的文件给出了可能的大小
+            sizes = cache.sizes_of(md5_value)
+        else:
+            sizes = None
+        if sizes:
+            candidates = [winfile for winfile in candidates
+                          if winfile.size_on_disk in sizes]
+
+        # stage 2, head md5
+        if head_md5 is not None:
+            matched = set([
+                winfile.abspath for winfile, digests in
+                FileCollection._hash_winfiles(
+                    candidates, head_nbytes, workers, executor, cache)
+                if digests["md5"] == head_md5
+            ])
+            candidates = [winfile for winfile in candidates
+                          if winfile.abspath in matched]
+
+        # stage 3, full md5
+        matched = set([
+            winfile.abspath for winfile, digests in
+            FileCollection._hash_winfiles(
+                candidates, 0, workers, executor, cache)
+            if digests["md5"] == md5_value
+        ])
+
+        fc_matched = FileCollection()
+        for winfile in candidates:  # keep the scan order
+            if winfile.abspath in matched:
+                fc_matched.files[winfile.abspath] = winfile
+        return fc_matched
+
+    @staticmethod
+    def from_path_by_file(path_or_path_list, reference_abspath, detail=None,
+                          workers=None, executor="thread", cache=None,
+                          head_nbytes=hashing.HEAD_NBYTES):
+        """Create a new FileCollection, and select all files which have the
+        same content as ``reference_abspath``. Its size and head md5 are
+        taken from the file, so most files are rejected by a ``stat``, or by
+        reading ``head_nbytes`` bytes, see
+        :meth:`FileCollection.from_path_by_md5`. The reference file itself is
+        included if it is in ``path_or_path_list``.
+
+        **中文文档**
+
+        找到与给定文件内容相同的所有文件。先比较文件大小, 再比较文件头部的
+        md5, 只有剩下的少数文件会计算完整的md5。
         """
-        path_or_path_list = FileCollection._preprocess(path_or_path_list)
+        if cache is not None:
+            md5_value = cache.md5file(reference_abspath)
+            head_md5 = cache.md5file(reference_abspath, nbytes=head_nbytes)
+        else:
+            md5_value = md5file(reference_abspath)
+            head_md5 = md5file(reference_abspath, nbytes=head_nbytes)
+        return FileCollection.from_path_by_md5(
+            path_or_path_list, md5_value, detail=detail, workers=workers,
+            executor=executor, cache=cache,
+            size_on_disk=os.path.getsize(reference_abspath),
+            head_md5=head_md5, head_nbytes=head_nbytes,
+        )
+
+    @staticmethod
+    def from_path_by_fingerprint(path_or_path_list, fingerprint_value,
+                                 detail=None, cache=None):
+        """Create a new FileCollection, and select all files that sampled
+        fingerprint is matching, see :func:`filetool.meth.fingerprint`.
+
+        The fingerprint starts with the file size, so only files of the same
+        size are sampled::
+
+            fc = FileCollection.from_path_by_fingerprint(
+                dir_path, WinFile(abspath).fingerprint)
+
+        :param path_or_path_list: absolute dir path, WinDir instance, list of
+          absolute dir path or list of WinDir instance.
+        :param fingerprint_value: the fingerprint to look for.
+        :param detail: 1, 2 or 3, which WinFile attributes are loaded eagerly
+          during the scan, see :meth:`WinFile.set_initialize_mode`.
+        :param cache: optional :class:`filetool.hashcache.HashCache`.
 
+        **中文文档**
+
+        选择所有抽样指纹与给定值相同的文件。指纹中包含了文件大小, 所以只有大小
+        相同的文件才会被读取。
+        """
+        size_on_disk = int(fingerprint_value.split("-", 1)[0])
+
+        @requires("size_on_disk", "fingerprint")
         def filter(winfile):
-            if winfile.md5 == md5_value:
-                return True
-            else:
+            if winfile.size_on_disk != size_on_disk:
                 return False
+            if cache is not None:
+                winfile.fingerprint = cache.fingerprint(winfile.abspath)
+            return winfile.fingerprint == fingerprint_value
 
-        init_mode = WinFile.init_mode
-        WinFile.use_slow_init()
-        fc = FileCollection.from_path_by_criterion(
-            path_or_path_list, filter, keepboth=False)
+        return FileCollection.from_path_by_criterion(
+            path_or_path_list, filter, keepboth=False, detail=detail)
+
+    @staticmethod
+    def _hash_winfiles(winfile_list, nbytes=0, workers=None,
+                       executor="thread", cache=None, algorithms=("md5", )):
+        """Yield ``(winfile, {algorithm: hexdigest})`` in the order hashing
+        completes. Full digests (``nbytes=0``) are also stored in
+        ``winfile.digests``, and already computed ones are reused.
+        """
+        mapping = dict()
+        for winfile in winfile_list:
+            if (not nbytes) and \
+                    all([a in winfile.digests for a in algorithms]):
+                yield winfile, winfile.load_digests(algorithms)
+            else:
+                mapping[winfile.abspath] = winfile
 
-        WinFile.set_initialize_mode(complexity=init_mode)
+        for abspath, digests in hashing.iter_hashfiles(
+                list(mapping), algorithms, workers=workers,
+                executor=executor, nbytes=nbytes, cache=cache):
+            winfile = mapping[abspath]
+            if not nbytes:
+                winfile.digests.update(digests)
+            yield winfile, digests
 
-        return fc
+    def load_md5(self, workers=None, executor="thread", cache=None):
+        """Compute md5 of all files which are not hashed yet, in parallel.
+
+        :param workers: pool size, default is the number of CPU.
+        :param executor: ``"thread"`` or ``"process"``, see
+          :func:`filetool.hashing.iter_md5files`.
+        :param cache: optional :class:`filetool.hashcache.HashCache`, it is
+          consulted before reading the file content.
+
+        **中文文档**
+
+        使用线程池或进程池, 并行计算所有尚未计算md5的文件的md5值。
+        """
+        self.load_digests(("md5", ), workers, executor, cache)
+
+    def load_digests(self, algorithms=("md5", ), workers=None,
+                     executor="thread", cache=None):
+        """Compute digests of all files with many ``hashlib`` algorithms, in
+        parallel, each file is read only once. Results are stored in
+        ``winfile.digests``.
+
+        :param algorithms: list of ``hashlib`` algorithm name, for example
+          ``("md5", "sha256")``.
+        :param workers: pool size, default is the number of CPU.
+        :param executor: ``"thread"`` or ``"process"``.
+        :param cache: optional :class:`filetool.hashcache.HashCache`.
+
+        **中文文档**
+
+        并行计算所有文件的多种哈希值, 每个文件只读取一次。
+        """
+        for _ in FileCollection._hash_winfiles(
+                self.files.values(), 0, workers, executor, cache,
+                algorithms):
+            pass
+
+    def iter_duplicates(self, min_size=1, workers=None, executor="thread",
+                        cache=None, head_nbytes=hashing.HEAD_NBYTES,
+                        batch_size=10000):
+        """Yield groups of identical files, see
+        :meth:`FileCollection.find_duplicates`. Groups are yielded batch by
+        batch, larger file size first.
+        """
+        by_size = dict()
+        for winfile in self.files.values():
+            size = winfile.size_on_disk
+            if size >= min_size:
+                by_size.setdefault(size, list()).append(winfile)
+
+        batch = list()
+        for size in sorted(by_size, reverse=True):
+            winfile_list = by_size.pop(size)
+            if len(winfile_list) < 2:  # 大小唯一的文件不可能重复
+                continue
+            batch.extend(winfile_list)
+            if len(batch) >= batch_size:
+                for group in FileCollection._find_duplicates_in_batch(
+                        batch, workers, executor, cache, head_nbytes):
+                    yield group
+                batch = list()
+
+        if batch:
+            for group in FileCollection._find_duplicates_in_batch(
+                    batch, workers, executor, cache, head_nbytes):
+                yield group
+
+    @staticmethod
+    def _group_by_digest(winfile_list, nbytes, workers, executor, cache):
+        """Group files by ``(size_on_disk, digest)``, only keep groups that
+        have more than one file.
+        """
+        groups = dict()
+        for winfile, digests in FileCollection._hash_winfiles(
+                winfile_list, nbytes, workers, executor, cache):
+            groups.setdefault(
+                (winfile.size_on_disk, digests["md5"]), list()).append(winfile)
+        return [group for group in groups.values() if len(group) > 1]
+
+    @staticmethod
+    def _find_duplicates_in_batch(winfile_list, workers, executor, cache,
+                                  head_nbytes):
+        confirmed, todo = list(), list()
+        for group in FileCollection._group_by_digest(
+                winfile_list, head_nbytes, workers, executor, cache):
+            if group[0].size_on_disk <= head_nbytes:  # 头部就是整个文件
+                confirmed.append(group)
+            else:
+                todo.extend(group)
+
+        if todo:
+            confirmed.extend(FileCollection._group_by_digest(
+                todo, 0, workers, executor, cache))
+
+        for group in confirmed:
+            group.sort(key=lambda winfile: winfile.abspath)
+            yield group, group[0].size_on_disk * (len(group) - 1)
+
+    def find_duplicates(self, min_size=1, workers=None, executor="thread",
+                        cache=None, head_nbytes=hashing.HEAD_NBYTES,
+                        batch_size=10000):
+        """Find groups of files with identical content.
+
+        Files are compared stage by stage, only the files still having a
+        possible duplicate go to the next stage:
+
+        1. group by size (stat only).
+        2. group by md5 of the first ``head_nbytes`` bytes.
+        3. group by full md5.
+
+        Hashing runs in parallel, see :meth:`FileCollection.load_md5`.
+        Candidates are hashed ``batch_size`` files at a time, so the memory
+        used for hashing doesn't grow with the number of files.
+
+        :param min_size: ignore files smaller than this, by default empty
+          files are ignored.
+        :param workers: hashing pool size.
+        :param executor: ``"thread"`` or ``"process"``.
+        :param cache: optional :class:`filetool.hashcache.HashCache`.
+        :param head_nbytes: size of the head hash.
+        :param batch_size: number of files hashed in one batch.
+        :return: list of ``(list_of_winfile, wasted_bytes)``, the most wasted
+          space first. ``wasted_bytes`` is the space freed by keeping only one
+          copy.
+
+        **中文文档**
+
+        找出内容完全相同的文件。依次按照文件大小, 文件头部的md5, 完整的md5分组,
+        只有可能重复的文件才会进入下一步。返回 ``(重复文件列表, 浪费的空间)``
+        的列表, 浪费空间最多的排在最前。
+        """
+        result = list(self.iter_duplicates(
+            min_size=min_size, workers=workers, executor=executor,
+            cache=cache, head_nbytes=head_nbytes, batch_size=batch_size,
+        ))
+        result.sort(key=lambda item: item[1], reverse=True)
+        return result
+
+    @staticmethod
+    def _sort_keys(attr_name, reverse):
+        """Normalize the ``attr_name`` argument of :meth:`FileCollection.sort_by`
+        to a tuple of ``(attribute, reverse)``.
+        """
+        if isinstance(attr_name, str_type):
+            attr_name = [attr_name, ]
+        keys = list()
+        for key in attr_name:
+            if isinstance(key, str_type):
+                key = (key, reverse)
+            elif not (isinstance(key, (list, tuple)) and (len(key) == 2) and
+                      isinstance(key[0], str_type)):
+                raise ValueError(
+                    "a sort key is an attribute name or a pair "
+                    "(attribute name, reverse), got %r; for one key with a "
+                    "direction, use [(name, reverse)]." % (key, ))
+            name, key_reverse = key
+            keys.append((_sort_attr(name), bool(key_reverse)))  # 时间按整数排序
+        if not keys:
+            raise ValueError("at least one sort key is required.")
+        return tuple(keys)
 
     def sort_by(self, attr_name, reverse=False):
-        """Sort files by one of it's attributes.
+        """Sort files by one or more of it's attributes::
+
+            fc.sort_by("mtime", reverse=True)
+            # by folder, then newest first in each folder
+            fc.sort_by(["dirname", ("mtime", True)])
+
+        :param attr_name: an attribute name, or a list of attribute name or
+          ``(attribute name, reverse)``.
+        :param reverse: the direction of keys given without one.
+
+        The values of each key are read once, and the result is cached per
+        keys until files are added or removed, so sorting again by the same
+        keys costs nothing. Changes of a WinFile itself, by
+        :meth:`WinFile.update`, and direct edits of ``self.files`` are not
+        tracked, call :meth:`FileCollection.invalidate` after them.
 
         **中文文档**
 
-        对容器内的WinFile根据其某一个属性升序或者降序排序。
+        对容器内的WinFile根据其一个或多个属性升序或者降序排序, 每个属性可以有
+        不同的排序方向。排序结果会被缓存, 直到添加或删除文件。
         """
+        keys = self._sort_keys(attr_name, reverse)
+        version, order = self._sort_cache.get(keys, (None, None))
+        if version != self._version:
+            order = self._sort(keys)
+            self._sort_cache[keys] = (self._version, order)
+        self._index = order  # tuple, 可以与缓存共享
+
+    def _sort(self, keys):
+        """Return the tuple of abspath sorted by ``keys``. Sort a permutation
+        once per key, last key first, python's sort is stable.
+        """
+        paths = list(self.files)
+        winfiles = list(self.files.values())
+        permutation = list(range(len(paths)))
         try:
-            d = dict()
-            for abspath, winfile in self.files.items():
-                d[abspath] = getattr(winfile, attr_name)
-            self.order = [item[0] for item in sorted(
-                list(d.items()), key=lambda t: t[1], reverse=reverse)]
+            for attr_name, reverse in reversed(keys):
+                values = [getattr(winfile, attr_name) for winfile in winfiles]
+                permutation.sort(key=values.__getitem__, reverse=reverse)
         except AttributeError:
-            raise ValueError("valid sortable attributes are: "
-                             "abspath, dirname, basename, fname, ext, "
-                             "size_on_disk, atime, ctime, mtime;")
+            raise _sortable_error()
+        return tuple([paths[i] for i in permutation])
 
     def sort_by_abspath(self, reverse=False):
         """
@@ -1124,18 +2042,251 @@ class FileCollection(object):
 
             return fcs
 
-    def __add__(self, other_fc):
+    #--- Secondary index ---
+    def create_index(self, stat=True):
+        """Build the secondary indexes by extension, parent directory, and if
+        ``stat`` is True, size and modification time, in one pass, see
+        :mod:`filetool.index`. They are kept in sync by ``add``, ``remove``
+        and the in-place set operators, and used by the ``select_by_*``
+        methods, which build the ones they need on first use.
+
+        The extension and directory indexes only read file names, the size
+        and time indexes ``stat`` every file whose attributes are not loaded
+        yet.
+
+        **中文文档**
+
+        一次遍历建立按扩展名, 父目录, 以及 (stat=True时) 文件大小, 修改时间的
+        二级索引。添加删除文件时索引会同步更新。``select_by_*`` 方法在第一次
+        调用时自动建立所需的索引, 按扩展名和目录查询不会访问磁盘。
+        """
+        self._file_index = FileIndex(self.files, stat=stat)
+        return self._file_index
+
+    def _get_file_index(self, stat=False):
+        file_index = self._file_index
+        if (file_index is None) or (len(file_index) != len(self.files)):
+            # 直接修改了 self.files 而没有调用 invalidate(), 重新建立索引
+            file_index = self.create_index(stat=stat)
+        elif stat and not file_index.has_stat:
+            file_index.build_stat(self.files)
+        return file_index
+
+    def _select_by_index(self, stat, query, *args):
+        """Run ``query(file_index, *args)``, a :class:`filetool.index.FileIndex`
+        method, and select the returned abspath. If one of them is not in
+        ``self.files`` any more, the index is out of date, it is rebuilt
+        once.
+        """
+        files = self.files
+        for _ in range(2):
+            selected = OrderedDict()
+            for abspath in query(self._get_file_index(stat), *args):
+                winfile = files.get(abspath)
+                if winfile is None:
+                    self._file_index = None
+                    break
+                selected[abspath] = winfile
+            else:
+                return self._from_files(selected)
+        raise RuntimeError("the secondary index is out of date.")
+
+    def select_by_ext(self, ext):
+        """Select files whose extension is ``ext``, or in ``ext`` if it is a
+        list, using the secondary index. No file is ``stat``'ed.
+
+        **中文文档**
+
+        使用索引, 选择扩展名为ext的文件, 不访问磁盘。
+        """
+        return self._select_by_index(False, FileIndex.ext, ext)
+
+    def select_by_dirname(self, dirname):
+        """Select files directly in the directory ``dirname``, using the
+        secondary index. No file is ``stat``'ed.
+
+        **中文文档**
+
+        使用索引, 选择父目录为dirname的文件, 不包括子目录中的文件, 不访问磁盘。
+        """
+        return self._select_by_index(
+            False, FileIndex.dirname, os.path.abspath(dirname))
+
+    def select_by_size(self, min_size=0, max_size=None):
+        """Select files whose size is in ``[min_size, max_size]``, using the
+        secondary index, smaller size bucket first.
+
+        **中文文档**
+
+        使用索引, 选择大小在 [min_size, max_size] 之间的文件。
+        """
+        return self._select_by_index(True, FileIndex.size, min_size, max_size)
+
+    def select_by_time(self, start=None, end=None):
+        """Select files whose modification time is in ``[start, end)``,
+        ``datetime`` or nanoseconds since epoch, using the secondary index,
+        oldest first.
+
+        **中文文档**
+
+        使用索引, 选择修改时间在 [start, end) 之间的文件, 按时间先后排列。
+        """
+        if isinstance(start, datetime):
+            start = datetime_to_ns(start)
+        if isinstance(end, datetime):
+            end = datetime_to_ns(end)
+        return self._select_by_index(True, FileIndex.mtime, start, end)
+
+    #--- Set algebra ---
+    # WinFile在集合运算中被视为不可变的快照, 结果与原集合共享同一个WinFile对象,
+    # 不再 deepcopy。
+    @staticmethod
+    def _check_other(other_fc):
         if not isinstance(other_fc, FileCollection):
-            raise TypeError(
-                "A FileCollection has to add with another FileCollection")
+            raise TypeError("A FileCollection can only do set operation "
+                            "with another FileCollection")
 
-        fc = copy.deepcopy(self)
-        for winfile in other_fc.iterfiles():
-            fc.files.setdefault(winfile.abspath, winfile)
+    @staticmethod
+    def _from_files(files):
+        """Create a FileCollection from an ``OrderedDict`` of
+        ``{abspath: WinFile}``, the dict is not copied.
+        """
+        fc = FileCollection()
+        fc.files = files
         return fc
 
+    def __or__(self, other_fc):
+        """Union, files of ``self`` first, then new files of ``other_fc``.
+        WinFile objects are shared, not copied.
+
+        **中文文档**
+
+        并集。结果与原集合共享WinFile对象。
+        """
+        self._check_other(other_fc)
+        files = OrderedDict(self.files)
+        for abspath, winfile in other_fc.files.items():
+            if abspath not in files:
+                files[abspath] = winfile
+        return self._from_files(files)
+
+    __add__ = __or__
+
+    def __sub__(self, other_fc):
+        """Difference, files of ``self`` not in ``other_fc``, in the order of
+        ``self``. Runs in time linear in the smaller collection, plus a copy
+        of ``self`` if ``other_fc`` is smaller.
+
+        **中文文档**
+
+        差集。结果与原集合共享WinFile对象。
+        """
+        self._check_other(other_fc)
+        if len(other_fc.files) < len(self.files):
+            files = OrderedDict(self.files)
+            for abspath in other_fc.files:
+                files.pop(abspath, None)
+        else:
+            other_files = other_fc.files
+            files = OrderedDict(
+                (abspath, winfile) for abspath, winfile in self.files.items()
+                if abspath not in other_files)
+        return self._from_files(files)
+
+    def __and__(self, other_fc):
+        """Intersection, WinFile objects of ``self`` are kept. Only the
+        smaller collection is iterated, so files are in its order.
+
+        **中文文档**
+
+        交集。只遍历较小的集合, 结果中文件的顺序与较小的集合相同。
+        """
+        self._check_other(other_fc)
+        files = self.files
+        if len(other_fc.files) < len(files):
+            files = OrderedDict(
+                (abspath, files[abspath]) for abspath in other_fc.files
+                if abspath in files)
+        else:
+            other_files = other_fc.files
+            files = OrderedDict(
+                (abspath, winfile) for abspath, winfile in files.items()
+                if abspath in other_files)
+        return self._from_files(files)
+
+    def __xor__(self, other_fc):
+        """Symmetric difference, files of ``self`` not in ``other_fc``, then
+        files of ``other_fc`` not in ``self``.
+
+        **中文文档**
+
+        对称差集。
+        """
+        self._check_other(other_fc)
+        files, other_files = self.files, other_fc.files
+        result = OrderedDict(
+            (abspath, winfile) for abspath, winfile in files.items()
+            if abspath not in other_files)
+        for abspath, winfile in other_files.items():
+            if abspath not in files:
+                result[abspath] = winfile
+        return self._from_files(result)
+
+    def __ior__(self, other_fc):
+        """In-place union, linear in ``other_fc``.
+        """
+        self._check_other(other_fc)
+        files, file_index = self.files, self._file_index
+        for abspath, winfile in other_fc.files.items():
+            if abspath not in files:
+                files[abspath] = winfile
+                if file_index is not None:
+                    file_index.add(abspath, winfile)
+        self._reset_order()
+        return self
+
+    __iadd__ = __ior__
+
+    def _discard(self, abspath_list):
+        """Remove files by abspath, keep the secondary indexes in sync.
+        """
+        files, file_index = self.files, self._file_index
+        for abspath in abspath_list:
+            winfile = files.pop(abspath, None)
+            if (winfile is not None) and (file_index is not None):
+                file_index.remove(abspath, winfile)
+        self._reset_order()
+
+    def __isub__(self, other_fc):
+        """In-place difference, linear in the smaller collection.
+        """
+        self._check_other(other_fc)
+        files = self.files
+        if len(other_fc.files) < len(files):
+            self._discard(other_fc.files)
+        else:
+            other_files = other_fc.files
+            self._discard([abspath for abspath in files
+                           if abspath in other_files])
+        return self
+
+    def __iand__(self, other_fc):
+        """In-place intersection, the order of ``self`` is kept.
+        """
+        self._check_other(other_fc)
+        other_files = other_fc.files
+        self._discard([abspath for abspath in self.files
+                       if abspath not in other_files])
+        return self
+
     @staticmethod
     def sum(list_of_fc):
+        """Union of many FileCollection, WinFile objects are shared.
+
+        **中文文档**
+
+        多个FileCollection的并集。
+        """
         for fc in list_of_fc:
             if not isinstance(fc, FileCollection):
                 raise TypeError("FileCollection.sum(list_of_fc) only take "
@@ -1143,43 +2294,54 @@ class FileCollection(object):
 
         _fc = FileCollection()
         for fc in list_of_fc:
-            for winfile in fc.iterfiles():
-                _fc.files.setdefault(winfile.abspath, winfile)
+            _fc |= fc
         return _fc
 
-    def __sub__(self, other_fc):
-        if not isinstance(other_fc, FileCollection):
-            raise TypeError(
-                "A FileCollection has to add with another FileCollection")
-
-        fc = copy.deepcopy(self)
-        for abspath in other_fc.iterpaths():
-            try:
-                del fc.files[abspath]
-            except:
-                pass
-        return fc
-
     #--- Useful recipe ---
     @staticmethod
-    def show_big_file(dir_path, threshold):
+    def show_big_file(dir_path, threshold=0, top_n=None, stream=False):
         """Print all file path that file size greater and equal than
-        ``#threshold``.
-        """
-        fc = FileCollection.from_path_by_size(dir_path, min_size=threshold)
-        fc.sort_by("size_on_disk")
+        ``#threshold``, smallest first.
+
+        Only ``(size, path)`` pairs are kept during the walk, never a
+        :class:`FileCollection`.
+
+        :param top_n: if given, only print the ``top_n`` largest files,
+          largest first. A heap of ``top_n`` items is kept during the walk.
+        :param stream: if True, print files in the walk order, as soon as
+          they are found, nothing is kept in memory.
+
+        **中文文档**
+
+        打印所有大于等于threshold的文件。给定top_n时, 遍历时只在堆中保留最大的
+        top_n个文件; stream=True时, 发现一个就打印一个, 不占用内存。
+        """
+        def iter_big_file():
+            for entry in FileCollection.yield_all_file_entry(dir_path):
+                if not entry.is_file():
+                    continue
+                size = entry.stat().st_size
+                if size >= threshold:
+                    yield size, entry.path
+
+        if top_n is not None:
+            items = heapq.nlargest(top_n, iter_big_file())
+            footer = "Above are the %s largest files' size greater than %s." \
+                % (top_n, repr_data_size(threshold))
+        else:
+            items = iter_big_file() if stream else sorted(iter_big_file())
+            footer = "Above are files' size greater than %s." % \
+                repr_data_size(threshold)
 
-        lines = list()
-        lines.append("Results:")
-        for winfile in fc.iterfiles():
-            lines.append("  %s - %s" %
-                         (repr_data_size(winfile.size_on_disk), winfile))
-        lines.append("Above are files' size greater than %s." %
-                     repr_data_size(threshold))
-        text = "\n".join(lines)
-        print(text)
         with open("__show_big_file__.log", "wb") as f:
-            f.write(text.encode("utf-8"))
+            def output(line):
+                print(line)
+                f.write((line + "\n").encode("utf-8"))
+
+            output("Results:")
+            for size, abspath in items:
+                output("  %s - %s" % (repr_data_size(size), abspath))
+            output(footer)
 
     @staticmethod
     def show_patterned_file(dir_path, pattern=list(), filename_only=True):
@@ -1187,12 +2349,14 @@ class FileCollection(object):
         """
         pattern = [i.lower() for i in pattern]
         if filename_only:
+            @requires("fname")
             def filter(winfile):
                 for p in pattern:
                     if p in winfile.fname.lower():
                         return True
                 return False
         else:
+            @requires("abspath")
             def filter(winfile):
                 for p in pattern:
                     if p in winfile.abspath.lower():
@@ -1264,9 +2428,11 @@ class FileCollection(object):
 
 
 class FileFilter(object):
-    """File filter container class.
+    """File filter container class. They only read the file extension, so
+    they are evaluated before any ``stat`` call, see :func:`requires`.
     """
     @staticmethod
+    @requires("ext")
     def image(winfile):
         """Image file filter.
         """
@@ -1277,6 +2443,7 @@ class FileFilter(object):
             return False
 
     @staticmethod
+    @requires("ext")
     def audio(winfile):
         """Audio file filter.
         """
@@ -1288,6 +2455,7 @@ class FileFilter(object):
             return False
 
     @staticmethod
+    @requires("ext")
     def video(winfile):
         """Video file filter.
         """
@@ -1299,6 +2467,7 @@ class FileFilter(object):
             return False
 
     @staticmethod
+    @requires("ext")
     def pdf(winfile):
         """Pdf file filter.
         """
@@ -1308,6 +2477,7 @@ class FileFilter(object):
             return False
 
     @staticmethod
+    @requires("ext")
     def word(winfile):
         """Microsoft Word file filter.
         """
@@ -1317,6 +2487,7 @@ class FileFilter(object):
             return False
 
     @staticmethod
+    @requires("ext")
     def excel(winfile):
         """Microsoft Excel file filter.
         """
@@ -1326,6 +2497,7 @@ class FileFilter(object):
             return False
 
     @staticmethod
+    @requires("ext")
     def ppt(winfile):
         """Microsoft Power Point file filter.
         """
@@ -1335,6 +2507,7 @@ class FileFilter(object):
             return False
 
     @staticmethod
+    @requires("ext")
     def archive(winfile):
         """Compressed archive file filter.
         """
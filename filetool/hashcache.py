@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+A persistent, size capped file hash cache backed by sqlite3.
+
+A cached digest is keyed by ``(st_dev, st_ino, st_size, st_mtime_ns)`` of
+the file plus the hash algorithm. As long as a file is not modified, its
+hash is read from the cache instead of from the file content. When the cache
+holds more than ``max_entries`` digests, the least recently used ones are
+evicted.
+
+Usage::
+
+    with HashCache("hash.sqlite") as cache:
+        fc = FileCollection.from_path(dir_path, detail=3, cache=cache)
+
+**中文文档**
+
+基于sqlite3的持久化文件哈希值缓存。以文件的 ``(st_dev, st_ino, st_size,
+st_mtime_ns)`` 和哈希算法作为键, 只要文件未被修改, 就直接从缓存中读取哈希值,
+而无需读取文件内容。缓存有容量上限, 超出时淘汰最久未被使用的记录。
+"""
+
+import os
+import sqlite3
+import threading
+
+try:
+    from .meth import (
+        hashfile, fingerprint, FINGERPRINT_SAMPLES, FINGERPRINT_SAMPLE_SIZE,
+    )
+except:
+    from filetool.meth import (
+        hashfile, fingerprint, FINGERPRINT_SAMPLES, FINGERPRINT_SAMPLE_SIZE,
+    )
+
+
+def algorithm_key(algorithm, nbytes=0):
+    """The name a digest is stored under, a head hash of the first ``nbytes``
+    bytes is stored apart from the full hash.
+    """
+    return "%s:%s" % (algorithm, nbytes) if nbytes else algorithm
+
+
+def stat_key(stat_result):
+    """Return the ``(st_dev, st_ino, st_size, st_mtime_ns)`` cache key.
+    """
+    mtime_ns = getattr(stat_result, "st_mtime_ns", None)
+    if mtime_ns is None:  # python2
+        mtime_ns = int(stat_result.st_mtime * 1000000000)
+    return (stat_result.st_dev, stat_result.st_ino,
+            stat_result.st_size, mtime_ns)
+
+
+class HashCache(object):
+    """Persistent file hash cache.
+
+    :param path: the sqlite database file path, ``":memory:"`` for a
+      non-persistent cache.
+    :param max_entries: max number of digests to keep, the least recently
+      used ones are evicted.
+    :param commit_every: commit to disk after this many writes.
+
+    It is thread safe, one instance can be shared by a hashing thread pool.
+
+    The cache is only used where it is passed explicitly:
+    :func:`filetool.hashing.iter_hashfiles` / ``iter_md5files``,
+    ``FileCollection.from_path(..., cache=)``, ``load_md5``,
+    ``from_path_by_md5``, ``from_path_by_fingerprint`` and
+    ``WinFile.load_digests(..., cache=)``. The lazy ``WinFile.md5``
+    attribute and ``WinFile(abspath, detail=3)`` always read the file.
+    """
+    _create_table_sql = (
+        "CREATE TABLE IF NOT EXISTS file_hash ("
+        "dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, "
+        "algorithm TEXT, digest TEXT, last_used INTEGER, "
+        "PRIMARY KEY (dev, ino, size, mtime_ns, algorithm))"
+    )
+    _create_index_sql = (
+        "CREATE INDEX IF NOT EXISTS file_hash_last_used "
+        "ON file_hash (last_used)"
+    )
+
+    def __init__(self, path, max_entries=1000000, commit_every=1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(self._create_table_sql)
+        self._conn.execute(self._create_index_sql)
+        self._conn.commit()
+
+        self._count, self._clock = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(last_used), 0) FROM file_hash"
+        ).fetchone()
+        self._uncommitted = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _tick(self):
+        self._clock += 1
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self._conn.commit()
+            self._uncommitted = 0
+        return self._clock
+
+    def get(self, stat_result, algorithm="md5"):
+        """Return the cached digest of a file, or None.
+
+        :param stat_result: ``os.stat`` result of the file.
+        """
+        key = stat_key(stat_result) + (algorithm, )
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM file_hash WHERE dev = ? AND ino = ? "
+                "AND size = ? AND mtime_ns = ? AND algorithm = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE file_hash SET last_used = ? WHERE dev = ? AND ino = ? "
+                "AND size = ? AND mtime_ns = ? AND algorithm = ?",
+                (self._tick(), ) + key,
+            )
+            return row[0]
+
+    def set(self, stat_result, digest, algorithm="md5"):
+        """Store the digest of a file.
+
+        :param stat_result: ``os.stat`` result of the file, taken before the
+          content is read.
+        """
+        key = stat_key(stat_result) + (algorithm, )
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_hash "
+                "(dev, ino, size, mtime_ns, algorithm, digest, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                key + (digest, self._tick()),
+            )
+            # it may replace an existing row, so this is an upper bound, the
+            # real count is taken before eviction
+            self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """Remove the least recently used digests, leave 10% free room so
+        eviction doesn't run on every insert.
+        """
+        self._count = self._conn.execute(
+            "SELECT COUNT(*) FROM file_hash").fetchone()[0]
+        n_remove = self._count - int(self.max_entries * 0.9)
+        if n_remove > 0:
+            self._conn.execute(
+                "DELETE FROM file_hash WHERE rowid IN ("
+                "SELECT rowid FROM file_hash ORDER BY last_used LIMIT ?)",
+                (n_remove, ),
+            )
+            self._count -= n_remove
+
+    def hashfile(self, abspath, algorithms=("md5", ), nbytes=0):
+        """Same as :func:`filetool.meth.hashfile`, but look up the cache first,
+        only the missing digests are computed.
+        """
+        stat_result = os.stat(abspath)
+        digests, missing = self.get_many(stat_result, algorithms, nbytes)
+        if missing:
+            new_digests = hashfile(abspath, missing, nbytes)
+            self.set_many(stat_result, new_digests, nbytes)
+            digests.update(new_digests)
+        return digests
+
+    def md5file(self, abspath, nbytes=0):
+        """Same as :func:`filetool.meth.md5file`, but look up the cache first.
+        """
+        return self.hashfile(abspath, ("md5", ), nbytes)["md5"]
+
+    def fingerprint(self, abspath,
+                    samples=FINGERPRINT_SAMPLES,
+                    sample_size=FINGERPRINT_SAMPLE_SIZE,
+                    algorithm="md5"):
+        """Same as :func:`filetool.meth.fingerprint`, but look up the cache
+        first.
+        """
+        stat_result = os.stat(abspath)
+        key = "fingerprint:%s:%s:%s" % (algorithm, samples, sample_size)
+        digest = self.get(stat_result, key)
+        if digest is None:
+            digest = fingerprint(abspath, samples, sample_size, algorithm)
+            self.set(stat_result, digest, key)
+        return digest
+
+    def sizes_of(self, digest, algorithm="md5"):
+        """Return the set of file sizes cached with this full digest. Files
+        with the same content have the same size, so any file whose digest is
+        ``digest`` has one of these sizes, if the set is not empty.
+        """
+        with self._lock:
+            return set(row[0] for row in self._conn.execute(
+                "SELECT DISTINCT size FROM file_hash "
+                "WHERE algorithm = ? AND digest = ?",
+                (algorithm, digest),
+            ))
+
+    def get_many(self, stat_result, algorithms, nbytes=0):
+        """Look up digests of many algorithms.
+
+        :return: ``({algorithm: digest}, list_of_missing_algorithm)``
+        """
+        digests, missing = dict(), list()
+        for algorithm in algorithms:
+            digest = self.get(stat_result, algorithm_key(algorithm, nbytes))
+            if digest is None:
+                missing.append(algorithm)
+            else:
+                digests[algorithm] = digest
+        return digests, missing
+
+    def set_many(self, stat_result, digests, nbytes=0):
+        """Store ``{algorithm: digest}`` of a file.
+        """
+        for algorithm, digest in digests.items():
+            self.set(stat_result, digest, algorithm_key(algorithm, nbytes))
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+#--- Unittest ---
+if __name__ == "__main__":
+    import unittest
+    from filetool.meth import md5file
+
+    class Unittest(unittest.TestCase):
+        def test_md5file(self):
+            with HashCache(":memory:") as cache:
+                md5 = cache.md5file("hashcache.py")
+                self.assertEqual(md5, md5file("hashcache.py"))
+                self.assertEqual(len(cache), 1)
+                self.assertEqual(
+                    cache.get(os.stat("hashcache.py")), md5)
+                self.assertEqual(cache.md5file("hashcache.py"), md5)
+                self.assertEqual(len(cache), 1)
+
+        def test_hashfile(self):
+            with HashCache(":memory:") as cache:
+                md5 = cache.md5file("hashcache.py")
+                digests = cache.hashfile("hashcache.py", ("md5", "sha256"))
+                self.assertEqual(digests["md5"], md5)
+                self.assertEqual(len(cache), 2)
+
+        def test_fingerprint(self):
+            with HashCache(":memory:") as cache:
+                fp = cache.fingerprint("hashcache.py")
+                self.assertEqual(fp, fingerprint("hashcache.py"))
+                self.assertEqual(len(cache), 1)
+                self.assertEqual(cache.fingerprint("hashcache.py"), fp)
+                self.assertEqual(len(cache), 1)
+
+        def test_sizes_of(self):
+            with HashCache(":memory:") as cache:
+                md5 = cache.md5file("hashcache.py")
+                self.assertEqual(cache.sizes_of(md5),
+                                 set([os.path.getsize("hashcache.py")]))
+                self.assertEqual(cache.sizes_of("0" * 32), set())
+
+        def test_lru_eviction(self):
+            with HashCache(":memory:", max_entries=10) as cache:
+                st = os.stat("hashcache.py")
+                for i in range(10):
+                    cache.set(st, "digest%s" % i, "algo%s" % i)
+                cache.get(st, "algo0")  # algo0 becomes the most recent
+                cache.set(st, "digest10", "algo10")
+                self.assertLessEqual(len(cache), 10)
+                self.assertEqual(cache.get(st, "algo0"), "digest0")
+                self.assertEqual(cache.get(st, "algo1"), None)
+
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Hash many files in parallel.
+
+``hashlib`` releases the GIL while digesting large buffers, and file reads
+release it too, so a thread pool is usually enough to saturate the disk. A
+process pool is also available for CPU bound cases.
+
+- :func:`iter_hashfiles`: yield ``(abspath, {algorithm: hexdigest})`` as
+  soon as each file is hashed.
+- :func:`iter_md5files`: yield ``(abspath, md5)`` as soon as each file is
+  hashed.
+
+**中文文档**
+
+使用线程池或进程池并行计算多个文件的哈希值, 哪个文件先算完就先返回哪个。
+"""
+
+import os
+
+try:
+    from concurrent.futures import (
+        ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED,
+    )
+except ImportError:  # pragma: no cover, python2 without ``futures``
+    ThreadPoolExecutor = ProcessPoolExecutor = None
+
+try:
+    from .meth import hashfile
+except:
+    from filetool.meth import hashfile
+
+
+#: default number of bytes of a "head" hash, the md5 of the beginning of a
+#: file, a cheap way to tell two files of the same size apart.
+HEAD_NBYTES = 1 << 16
+
+
+def cpu_count():
+    try:
+        return os.cpu_count() or 1
+    except AttributeError:  # python2
+        import multiprocessing
+        return multiprocessing.cpu_count()
+
+
+def _hashfile_task(abspath, algorithms, nbytes):
+    return abspath, hashfile(abspath, algorithms, nbytes)
+
+
+def iter_hashfiles(abspath_list, algorithms=("md5", ), workers=None,
+                   executor="thread", nbytes=0, cache=None):
+    """Compute digests of many files in parallel, each file is read once for
+    all ``algorithms``. Yield ``(abspath, {algorithm: hexdigest})`` in the
+    order they complete.
+
+    :param abspath_list: iterable of absolute file path, it is consumed
+      lazily, at most ``4 * workers`` files are in flight.
+    :param algorithms: list of ``hashlib`` algorithm name.
+    :param workers: pool size, default is the number of CPU.
+    :param executor: ``"thread"`` or ``"process"``.
+    :param nbytes: only hash the first N bytes of each file, if 0, hash all.
+    :param cache: optional :class:`filetool.hashcache.HashCache`, cached
+      digests are yielded without reading the file, new digests are stored.
+
+    **中文文档**
+
+    使用线程池 (``executor="thread"``) 或进程池 (``executor="process"``)
+    并行计算文件的哈希值, 每个文件只读取一次, 按完成的先后顺序返回。
+    """
+    if executor == "thread":
+        executor_class = ThreadPoolExecutor
+    elif executor == "process":
+        executor_class = ProcessPoolExecutor
+    else:
+        raise ValueError("executor has to be 'thread' or 'process'.")
+
+    if workers is None:
+        workers = cpu_count()
+
+    algorithms = tuple(algorithms)
+    if cache is not None:
+        # 在主线程中查询缓存, 只把未命中的文件交给线程池
+        pending = dict()
+        todo = _iter_cache_miss(abspath_list, algorithms, nbytes, cache, pending)
+    else:
+        todo = ((abspath, algorithms) for abspath in abspath_list)
+
+    for abspath, digests in _iter_hashfiles(
+            todo, workers, executor_class, nbytes):
+        if (cache is not None) and (abspath in pending):  # cache miss
+            stat_result, cached_digests = pending.pop(abspath)
+            cache.set_many(stat_result, digests, nbytes)
+            digests.update(cached_digests)
+        yield abspath, digests
+
+
+def iter_md5files(abspath_list, workers=None, executor="thread", nbytes=0,
+                  cache=None):
+    """Compute md5 of many files in parallel, yield ``(abspath, md5)`` in the
+    order they complete. See :func:`iter_hashfiles`.
+    """
+    for abspath, digests in iter_hashfiles(
+            abspath_list, ("md5", ), workers=workers, executor=executor,
+            nbytes=nbytes, cache=cache):
+        yield abspath, digests["md5"]
+
+
+def _iter_cache_miss(abspath_list, algorithms, nbytes, cache, pending):
+    """Yield ``(abspath, missing_algorithms)`` if some digests are not cached,
+    or ``(abspath, digests)`` if all of them are, so cache hits flow through
+    the pool loop without being hashed.
+    """
+    for abspath in abspath_list:
+        stat_result = os.stat(abspath)
+        digests, missing = cache.get_many(stat_result, algorithms, nbytes)
+        if missing:
+            pending[abspath] = (stat_result, digests)
+            yield abspath, tuple(missing)
+        else:
+            yield abspath, digests
+
+
+def _iter_hashfiles(todo, workers, executor_class, nbytes):
+    """``todo`` items are either ``(abspath, algorithms)`` to hash, or an
+    already known ``(abspath, digests)`` which is yielded as it is.
+    """
+    if (executor_class is None) or (workers <= 1):  # serial
+        for abspath, item in todo:
+            if isinstance(item, dict):
+                yield abspath, item
+            else:
+                yield _hashfile_task(abspath, item, nbytes)
+        return
+
+    max_in_flight = 4 * workers
+    with executor_class(max_workers=workers) as pool:
+        in_flight = set()
+        for abspath, item in todo:
+            if isinstance(item, dict):
+                yield abspath, item
+                continue
+            in_flight.add(pool.submit(_hashfile_task, abspath, item, nbytes))
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
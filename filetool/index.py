@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Secondary indexes of a :class:`filetool.files.FileCollection`, built in one
+pass, then maintained by ``add`` and ``remove``. The name indexes only read
+the path, the stat indexes, size and modification time, are built
+separately, only when they are queried:
+
+- extension: ``{ext: {abspath: WinFile}}``.
+- parent directory: ``{dirname: {abspath: WinFile}}``.
+- size bucket: ``{size.bit_length(): {abspath: WinFile}}``, bucket ``b``
+  holds sizes in ``[2 ** (b - 1), 2 ** b)``, only the two boundary buckets of
+  a range query are filtered.
+- modification time: ``mtime_ns`` in a sorted ``array("q")``, with the
+  abspath of each file in a parallel list, a range query is two bisections.
+
+A query costs time proportional to the size of its result, not to the size
+of the collection. See :meth:`filetool.files.FileCollection.select_by_ext`.
+
+**中文文档**
+
+FileCollection的二级索引, 包括扩展名, 父目录, 按2的幂分组的文件大小, 以及
+排序后的修改时间数组。索引一次遍历建立, 在添加删除文件时同步更新, 查询的耗时
+只与结果的数量有关。
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+def _add(table, key, abspath, winfile):
+    try:
+        table[key][abspath] = winfile
+    except KeyError:
+        table[key] = {abspath: winfile}
+
+
+def _remove(table, key, abspath):
+    files = table[key]
+    del files[abspath]
+    if not files:
+        del table[key]
+
+
+def size_bucket(size):
+    """The bucket of a file size, 0 for empty files, otherwise ``b`` so that
+    ``2 ** (b - 1) <= size < 2 ** b``.
+    """
+    return size.bit_length()
+
+
+class FileIndex(object):
+    """Secondary indexes of many WinFile.
+
+    Files are indexed by their attribute values when they are added, the
+    index is not updated by :meth:`filetool.files.WinFile.update` or
+    :meth:`filetool.files.WinFile.rename`.
+
+    :param files: ``{abspath: WinFile}``, like
+      :attr:`filetool.files.FileCollection.files`, indexed in one pass.
+    :param stat: if True, also build the size and mtime indexes, which
+      ``stat`` files not loaded yet, see :meth:`FileIndex.build_stat`.
+
+    **中文文档**
+
+    WinFile的二级索引。扩展名和父目录索引只读取路径; 文件大小和修改时间索引
+    需要访问磁盘, 只在需要时建立。
+    """
+
+    def __init__(self, files=None, stat=False):
+        self.by_ext = dict()
+        self.by_dirname = dict()
+        self.by_size_bucket = None
+        self.mtime_ns = None
+        self.mtime_path = None
+        self._count = 0
+
+        files = files or dict()
+        for abspath, winfile in files.items():
+            _add(self.by_ext, winfile.ext, abspath, winfile)
+            _add(self.by_dirname, winfile.dirname, abspath, winfile)
+        self._count = len(files)
+        if stat:
+            self.build_stat(files)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def has_stat(self):
+        """True if the size and mtime indexes are built.
+        """
+        return self.by_size_bucket is not None
+
+    def build_stat(self, files):
+        """Build the size and mtime indexes of ``files``, the same files as
+        the name indexes, in one pass.
+        """
+        self.by_size_bucket = dict()
+        mtime_list = list()
+        for abspath, winfile in files.items():
+            _add(self.by_size_bucket, size_bucket(winfile.size_on_disk),
+                 abspath, winfile)
+            mtime_list.append((winfile.mtime_ns, abspath))
+        mtime_list.sort()
+        self.mtime_ns = array("q", [mtime for mtime, _ in mtime_list])
+        self.mtime_path = [abspath for _, abspath in mtime_list]
+
+    def _mtime_position(self, mtime_ns, abspath):
+        """Position of ``(mtime_ns, abspath)`` in the sorted mtime arrays.
+        """
+        lo = bisect_left(self.mtime_ns, mtime_ns)
+        hi = bisect_right(self.mtime_ns, mtime_ns, lo)
+        return bisect_left(self.mtime_path, abspath, lo, hi)
+
+    def add(self, abspath, winfile):
+        """Index a new file.
+        """
+        _add(self.by_ext, winfile.ext, abspath, winfile)
+        _add(self.by_dirname, winfile.dirname, abspath, winfile)
+        self._count += 1
+        if self.has_stat:
+            _add(self.by_size_bucket, size_bucket(winfile.size_on_disk),
+                 abspath, winfile)
+            i = self._mtime_position(winfile.mtime_ns, abspath)
+            self.mtime_ns.insert(i, winfile.mtime_ns)
+            self.mtime_path.insert(i, abspath)
+
+    def remove(self, abspath, winfile):
+        """Remove an indexed file. Raise KeyError if it is not indexed under
+        its current attribute values, for example after
+        :meth:`filetool.files.WinFile.update`.
+        """
+        _remove(self.by_ext, winfile.ext, abspath)
+        _remove(self.by_dirname, winfile.dirname, abspath)
+        self._count -= 1
+        if self.has_stat:
+            _remove(self.by_size_bucket, size_bucket(winfile.size_on_disk),
+                    abspath)
+            i = self._mtime_position(winfile.mtime_ns, abspath)
+            if (i >= len(self.mtime_path)) or (self.mtime_path[i] != abspath):
+                raise KeyError("%r is not indexed at mtime_ns %s, the index "
+                               "is out of date" % (abspath, winfile.mtime_ns))
+            del self.mtime_ns[i]
+            del self.mtime_path[i]
+
+    def ext(self, ext):
+        """Return the list of abspath whose extension is ``ext``, or in
+        ``ext`` if it is a list, tuple or set.
+        """
+        if isinstance(ext, (list, tuple, set, frozenset)):
+            result = list()
+            for e in ext:
+                result.extend(self.by_ext.get(e, ()))
+            return result
+        return list(self.by_ext.get(ext, ()))
+
+    def dirname(self, dirname):
+        """Return the list of abspath of files directly in ``dirname``.
+        """
+        return list(self.by_dirname.get(dirname, ()))
+
+    def size(self, min_size=0, max_size=None):
+        """Return the list of abspath whose size is in
+        ``[min_size, max_size]``, in ascending bucket order.
+        """
+        if max_size is None:
+            max_bucket = max(self.by_size_bucket) if self.by_size_bucket else 0
+        else:
+            max_bucket = size_bucket(max_size)
+        min_bucket = size_bucket(max(min_size, 0))
+
+        result = list()
+        for bucket in range(min_bucket, max_bucket + 1):
+            files = self.by_size_bucket.get(bucket)
+            if not files:
+                continue
+            if (bucket == min_bucket) or (bucket == max_bucket):  # 边界, 需要筛选
+                for abspath, winfile in files.items():
+                    size = winfile.size_on_disk
+                    if (size >= min_size) and \
+                            ((max_size is None) or (size <= max_size)):
+                        result.append(abspath)
+            else:
+                result.extend(files)
+        return result
+
+    def mtime(self, start=None, end=None):
+        """Return the list of abspath whose ``mtime_ns`` is in
+        ``[start, end)``, oldest first.
+        """
+        lo = 0 if start is None else bisect_left(self.mtime_ns, start)
+        hi = len(self.mtime_ns) if end is None \
+            else bisect_left(self.mtime_ns, end, lo)
+        return self.mtime_path[lo:hi]
+
+
+#--- Unittest ---
+if __name__ == "__main__":
+    import unittest
+
+    class FakeFile(object):
+        def __init__(self, abspath, ext, dirname, size_on_disk, mtime_ns):
+            self.abspath = abspath
+            self.ext = ext
+            self.dirname = dirname
+            self.size_on_disk = size_on_disk
+            self.mtime_ns = mtime_ns
+
+    class Unittest(unittest.TestCase):
+        def test_index(self):
+            files = [
+                FakeFile("/a/%s.%s" % (i, ext), "." + ext,
+                         "/a" if i % 2 else "/b", i * 100, i % 5)
+                for i, ext in enumerate(["txt", "log", "txt", "jpg"] * 25)
+            ]
+            index = FileIndex(dict((f.abspath, f) for f in files[:60]),
+                              stat=True)
+            for winfile in files[60:]:
+                index.add(winfile.abspath, winfile)
+            for winfile in files[10:20]:
+                index.remove(winfile.abspath, winfile)
+            files = files[:10] + files[20:]
+
+            def expected(func):
+                return sorted(f.abspath for f in files if func(f))
+
+            self.assertEqual(len(index), len(files))
+            self.assertEqual(sorted(index.ext(".txt")),
+                             expected(lambda f: f.ext == ".txt"))
+            self.assertEqual(sorted(index.ext([".log", ".jpg"])),
+                             expected(lambda f: f.ext != ".txt"))
+            self.assertEqual(sorted(index.dirname("/a")),
+                             expected(lambda f: f.dirname == "/a"))
+            for min_size, max_size in [(0, None), (150, 2000), (0, 0),
+                                       (700, 700), (5000, None)]:
+                self.assertEqual(
+                    sorted(index.size(min_size, max_size)),
+                    expected(lambda f: f.size_on_disk >= min_size and (
+                        max_size is None or f.size_on_disk <= max_size)))
+            self.assertEqual(sorted(index.mtime(1, 3)),
+                             expected(lambda f: 1 <= f.mtime_ns < 3))
+            self.assertEqual(list(index.mtime_ns), sorted(index.mtime_ns))
+
+            winfile = files[0]
+            winfile.mtime_ns += 1  # 索引之后文件被修改
+            self.assertRaises(KeyError, index.remove, winfile.abspath, winfile)
+
+        def test_name_index(self):
+            class NameOnly(object):  # 读取大小或时间会报错
+                def __init__(self, abspath):
+                    self.abspath = abspath
+                    self.dirname, name = abspath.rsplit("/", 1)
+                    self.ext = "." + name.rsplit(".", 1)[-1]
+
+            files = dict((p, NameOnly(p)) for p in ["/a/1.txt", "/a/2.log"])
+            index = FileIndex(files)
+            index.add("/b/3.txt", NameOnly("/b/3.txt"))
+            index.remove("/a/2.log", files["/a/2.log"])
+            self.assertFalse(index.has_stat)
+            self.assertEqual(sorted(index.ext(".txt")), ["/a/1.txt", "/b/3.txt"])
+            self.assertEqual(index.dirname("/a"), ["/a/1.txt"])
+
+    unittest.main()
@@ -2,6 +2,9 @@
 # -*- coding: utf-8 -*-
 
 
+import io
+import os
+import mmap
 import hashlib
 
 
@@ -45,6 +48,202 @@ def repr_data_size(size_in_bytes, precision=2):
     return s
 
 
+# python2 can't make a memoryview of a mmap
+_memoryview_releasable = hasattr(memoryview, "release")
+
+#: preferred size of one read when hashing a file.
+CHUNK_SIZE = 1 << 18  # 256 KB
+
+#: in ``"auto"`` mode, files at least this large are hashed through ``mmap``.
+MMAP_THRESHOLD = 1 << 24  # 16 MB
+
+
+def chunk_size_of(stat_result, nbytes=0):
+    """Choose the read size for hashing a file: a multiple of the file system
+    block size ``st_blksize``, no larger than :data:`CHUNK_SIZE`, and no larger
+    than the file itself, so a small file is read in one call.
+    """
+    blksize = getattr(stat_result, "st_blksize", 0) or 4096
+    size = stat_result.st_size
+    if nbytes:
+        size = min(size, nbytes)
+    size = min(max(size, 1), CHUNK_SIZE)
+    return max(blksize, (size + blksize - 1) // blksize * blksize)
+
+
+def _update_by_read(f, hashers, chunk_size, nbytes):
+    """Plain read loop, a new bytes object per chunk. A file no larger than
+    one chunk costs one read, and one more to see EOF.
+    """
+    remain = nbytes
+    while True:
+        if nbytes:
+            if remain <= 0:
+                break
+            data = f.read(min(chunk_size, remain))
+            remain -= len(data)
+        else:
+            data = f.read(chunk_size)
+        if not data:
+            break
+        for _, m in hashers:
+            m.update(data)
+
+
+def _update_by_readinto(f, hashers, chunk_size, nbytes):
+    """Read into one preallocated buffer again and again, no bytes object is
+    created per chunk.
+    """
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    remain = nbytes
+    while True:
+        if nbytes:
+            if remain <= 0:
+                break
+            n = f.readinto(view[:min(chunk_size, remain)])
+            remain -= n or 0
+        else:
+            n = f.readinto(view)
+        if not n:
+            break
+        data = view[:n]
+        for _, m in hashers:
+            m.update(data)
+
+
+def _update_by_mmap(f, hashers, chunk_size, size):
+    m_map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+    try:
+        view = memoryview(m_map)
+        try:
+            for start in range(0, size, chunk_size):
+                data = view[start:start + chunk_size]
+                for _, m in hashers:
+                    m.update(data)
+                data.release()
+        finally:
+            view.release()
+    finally:
+        m_map.close()
+
+
+def hashfile(abspath, algorithms=("md5", ), nbytes=0, mode="read"):
+    """Return hash values of a piece of a file, with many algorithms in a
+    single read pass.
+
+    :param abspath: the absolute path to the file
+    :param algorithms: list of ``hashlib`` algorithm name, for example
+      ``("md5", "sha256", "blake2b")``
+    :param nbytes: only has first N bytes of the file. if 0, hash all file
+    :param mode: ``"read"`` (default), read :data:`CHUNK_SIZE` bytes at a
+      time, ``"readinto"``, read into a reused buffer, ``"mmap"``, map the
+      file into memory, or ``"auto"``, use ``mmap`` for files larger than
+      :data:`MMAP_THRESHOLD`. ``mmap`` is opt-in: if the file is truncated
+      while it is mapped, the process is killed by ``SIGBUS``. On python2 it
+      falls back to ``"read"``.
+    :return: ``{algorithm: hexdigest}``
+
+    The file is read until EOF in every mode, a file growing during the
+    hash is hashed entirely, not only the size seen when it was opened.
+
+    **中文文档**
+
+    只读取一次文件, 同时计算多种哈希值。默认每次读取 :data:`CHUNK_SIZE` 字节,
+    小文件只需一次读取; 可选重复使用同一块预先分配的内存读取, 或使用 ``mmap``,
+    但如果文件在读取时被截断, 进程会因 ``SIGBUS`` 而终止。
+    """
+    if mode not in ("read", "auto", "readinto", "mmap"):
+        raise ValueError(
+            "mode has to be 'read', 'auto', 'readinto' or 'mmap'.")
+
+    hashers = [(algorithm, hashlib.new(algorithm)) for algorithm in algorithms]
+    with io.open(abspath, "rb", buffering=0) as f:
+        if mode == "read":  # 不需要知道文件大小, 省去一次 fstat
+            _update_by_read(f, hashers, CHUNK_SIZE, nbytes)
+            return dict([(algorithm, m.hexdigest())
+                         for algorithm, m in hashers])
+
+        stat_result = os.fstat(f.fileno())
+        chunk_size = chunk_size_of(stat_result, nbytes)
+        size = stat_result.st_size
+        if nbytes:
+            size = min(size, nbytes)
+
+        if mode == "auto":
+            mode = "mmap" if size >= MMAP_THRESHOLD else "read"
+        if (mode == "mmap") and (not _memoryview_releasable):  # python2
+            mode = "read"
+
+        if (mode == "mmap") and (size > 0):
+            _update_by_mmap(f, hashers, chunk_size, size)
+            if (not nbytes) or (size < nbytes):
+                # 文件在此期间可能变大了, 继续读取到文件末尾
+                f.seek(size)
+                _update_by_read(
+                    f, hashers, chunk_size, (nbytes - size) if nbytes else 0)
+        elif mode == "readinto":
+            _update_by_readinto(f, hashers, chunk_size, nbytes)
+        else:
+            _update_by_read(f, hashers, chunk_size, nbytes)
+    return dict([(algorithm, m.hexdigest()) for algorithm, m in hashers])
+
+
+#: number of samples read by :func:`fingerprint`, head and tail included.
+FINGERPRINT_SAMPLES = 8
+
+#: size of each sample read by :func:`fingerprint`.
+FINGERPRINT_SAMPLE_SIZE = 1 << 16  # 64 KB
+
+
+def _pread(f, n, offset):
+    try:
+        return os.pread(f.fileno(), n, offset)
+    except AttributeError:  # windows, python2
+        f.seek(offset)
+        return f.read(n)
+
+
+def fingerprint(abspath,
+                samples=FINGERPRINT_SAMPLES,
+                sample_size=FINGERPRINT_SAMPLE_SIZE,
+                algorithm="md5"):
+    """Return a fast, sampled fingerprint of a file, in format
+    ``"<size>-<hexdigest>"``.
+
+    The digest covers the file size, and ``samples`` pieces of
+    ``sample_size`` bytes: the head, the tail, and evenly spaced offsets in
+    between. A multi-GB file is fingerprinted with a few positioned reads.
+    A file no larger than ``samples * sample_size`` is hashed entirely.
+
+    ``samples`` has to be at least 2, for the head and the tail.
+
+    It is meant for change detection, two files with the same fingerprint
+    are very likely, but not guaranteed, to be identical. It is not
+    comparable with :func:`md5file`.
+
+    **中文文档**
+
+    快速计算文件的抽样指纹。对文件大小, 以及文件头部, 尾部, 和中间均匀分布的
+    若干片段计算哈希值。只需少量的读取, 适用于检测超大文件是否发生了变化。
+    """
+    if samples < 2:
+        raise ValueError("samples has to be at least 2, head and tail.")
+
+    m = hashlib.new(algorithm)
+    with io.open(abspath, "rb", buffering=0) as f:
+        stat_result = os.fstat(f.fileno())
+        size = stat_result.st_size
+        m.update(("%s:" % size).encode("ascii"))
+        if size <= samples * sample_size:
+            _update_by_read(f, [(algorithm, m)], CHUNK_SIZE, 0)
+        else:
+            step = (size - sample_size) / float(samples - 1)
+            for i in range(samples):
+                m.update(_pread(f, sample_size, int(i * step)))
+    return "%s-%s" % (size, m.hexdigest())
+
+
 def md5file(abspath, nbytes=0):
     """Return md5 hash value of a piece of a file
     
@@ -62,19 +261,7 @@ def md5file(abspath, nbytes=0):
     - 2.5G - 10.32 sec
     - 3.9G - 16.0 sec
     """    
-    m = hashlib.md5()
-    with open(abspath, "rb") as f:
-        if nbytes:
-            data = f.read(nbytes)
-            if data:
-                m.update(data)
-        else:
-            while True:
-                data = f.read(4 * 1 << 16) # only use first 4GB data
-                if not data:
-                    break
-                m.update(data)
-    return m.hexdigest()
+    return hashfile(abspath, ("md5", ), nbytes)["md5"]
 
 
 #--- Unittest ---
@@ -95,5 +282,28 @@ if __name__ == "__main__":
         
         def test_md5file(self):
             md5 = md5file("meth.py")
+
+        def test_hashfile(self):
+            digests = hashfile("meth.py", ("md5", "sha256"))
+            self.assertEqual(digests["md5"], md5file("meth.py"))
+            with open("meth.py", "rb") as f:
+                content = f.read()
+            self.assertEqual(
+                digests["sha256"], hashlib.sha256(content).hexdigest())
+
+            for mode in ("read", "readinto", "mmap", "auto"):
+                self.assertEqual(
+                    hashfile("meth.py", ("md5", ), mode=mode)["md5"],
+                    hashlib.md5(content).hexdigest())
+                self.assertEqual(
+                    hashfile("meth.py", ("md5", ), nbytes=100, mode=mode)["md5"],
+                    hashlib.md5(content[:100]).hexdigest())
+
+        def test_fingerprint(self):
+            fp = fingerprint("meth.py")
+            self.assertEqual(fp, fingerprint("meth.py"))
+            self.assertTrue(fp.startswith("%s-" % os.path.getsize("meth.py")))
+            self.assertNotEqual(fp, fingerprint("meth.py", sample_size=100))
+            self.assertRaises(ValueError, fingerprint, "meth.py", samples=1)
             
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+A lazy, chainable file query, executed in one streaming pass over the
+directory tree.
+
+Usage, the newest 100 log files::
+
+    query = FileQuery(dir_path) \\
+        .where(ext=".log") \\
+        .order_by("mtime", reverse=True) \\
+        .limit(100)
+    for winfile in query:
+        print(winfile)
+
+Nothing happens until the query is iterated. Then the directory tree is
+walked once:
+
+1. criteria which only read file name attributes (see
+   :func:`filetool.files.requires`) are evaluated before any ``stat`` call.
+2. the other criteria are evaluated on the survivors.
+3. with ``order_by`` and ``limit``, only the best ``n`` files are kept in a
+   bounded heap, the memory doesn't grow with the size of the tree. With
+   ``limit`` only, the walk stops as soon as ``n`` files are found.
+
+**中文文档**
+
+惰性的链式文件查询。在遍历之前不会执行任何操作, 所有的筛选, 排序, 数量限制
+会在一次遍历中完成。只需要文件名的筛选条件会在访问磁盘之前执行; 有数量限制的
+排序只在堆中保留前n个文件, 内存占用与文件总数无关。
+"""
+
+import copy
+import heapq
+import itertools
+
+try:
+    from .files import (
+        WinFile, FileCollection, STAT_ATTRS, requires, _required_detail,
+        _sort_attr, _sortable_error,
+    )
+except:
+    from filetool.files import (
+        WinFile, FileCollection, STAT_ATTRS, requires, _required_detail,
+        _sort_attr, _sortable_error,
+    )
+
+
+def _attr_criterion(attr, value):
+    """Create a criterion testing ``winfile.<attr> == value``, or
+    ``winfile.<attr> in value`` if value is a list, tuple or set.
+    """
+    if isinstance(value, (list, tuple, set, frozenset)):
+        value = set(value)
+
+        @requires(attr)
+        def criterion(winfile):
+            return getattr(winfile, attr) in value
+    else:
+        @requires(attr)
+        def criterion(winfile):
+            return getattr(winfile, attr) == value
+    return criterion
+
+
+def _match_all(criteria, winfile):
+    for criterion in criteria:
+        if not criterion(winfile):
+            return False
+    return True
+
+
+def _negate(criterion):
+    def negated(winfile):
+        return not criterion(winfile)
+
+    attrs = getattr(criterion, "requires", None)
+    if attrs is not None:
+        negated.requires = attrs
+    return negated
+
+
+class FileQuery(object):
+    """A lazy file query, every method returns a new query, the original one
+    is unchanged.
+
+    :param path_or_path_list: absolute dir path, WinDir instance, list of
+      absolute dir path or list of WinDir instance.
+    :param detail: 1, 2 or 3, which WinFile attributes of the result are
+      loaded eagerly, see :meth:`filetool.files.WinFile.set_initialize_mode`.
+    :param recursive: if False, files in sub directories are not included.
+
+    **中文文档**
+
+    惰性的文件查询。每一个方法都返回一个新的查询对象。
+    """
+
+    def __init__(self, path_or_path_list, detail=None, recursive=True):
+        self.path_list = FileCollection._preprocess(path_or_path_list)
+        self.detail = detail
+        self.recursive = recursive
+        self._criteria = list()
+        self._order_by = None  # (attr_name, reverse)
+        self._limit = None
+
+    def _clone(self):
+        query = copy.copy(self)
+        query._criteria = list(self._criteria)
+        return query
+
+    def where(self, criterion=None, **attrs):
+        """Only keep files matching ``criterion``, and whose attributes equal
+        the given values, or are in the given list::
+
+            query.where(FileFilter.image)
+            query.where(ext=[".jpg", ".png"])
+
+        Declare the attributes a custom criterion reads with
+        :func:`filetool.files.requires`, so it can be evaluated before the
+        file is ``stat``'ed.
+        """
+        query = self._clone()
+        if criterion is not None:
+            query._criteria.append(criterion)
+        for attr, value in sorted(attrs.items()):
+            query._criteria.append(_attr_criterion(attr, value))
+        return query
+
+    def exclude(self, criterion=None, **attrs):
+        """Remove files matching ``criterion``, or whose attributes equal the
+        given values, see :meth:`FileQuery.where`.
+        """
+        query = self._clone()
+        if criterion is not None:
+            query._criteria.append(_negate(criterion))
+        for attr, value in sorted(attrs.items()):
+            query._criteria.append(_negate(_attr_criterion(attr, value)))
+        return query
+
+    def order_by(self, attr_name, reverse=False):
+        """Sort the result by one WinFile attribute. Time attributes are
+        compared as integer nanoseconds.
+        """
+        query = self._clone()
+        query._order_by = (_sort_attr(attr_name), reverse)
+        return query
+
+    def limit(self, n):
+        """Only return the first ``n`` files.
+        """
+        query = self._clone()
+        query._limit = n
+        return query
+
+    def _iter_matched(self):
+        """Walk the tree once, yield WinFile matching all criteria, in the
+        walk order.
+        """
+        name_criteria, other_criteria = list(), list()
+        for criterion in self._criteria:
+            if _required_detail(criterion) == 1:
+                name_criteria.append(criterion)
+            else:
+                other_criteria.append(criterion)
+
+        detail = WinFile.init_mode if self.detail is None else self.detail
+        load_stat = bool(other_criteria) or (detail >= 2) or \
+            ((self._order_by is not None) and
+             (self._order_by[0] in STAT_ATTRS))
+
+        seen = set() if len(self.path_list) > 1 else None
+        for dir_path in self.path_list:
+            for entry in FileCollection.yield_all_file_entry(
+                    dir_path, recursive=self.recursive):
+                winfile = WinFile.from_entry(entry, 1)
+                if not _match_all(name_criteria, winfile):
+                    continue
+                if load_stat:
+                    winfile._load_stat(entry.stat())
+                if not _match_all(other_criteria, winfile):
+                    continue
+                if seen is not None:
+                    if winfile.abspath in seen:
+                        continue
+                    seen.add(winfile.abspath)
+                yield winfile
+
+    def iter(self):
+        """Execute the query, yield WinFile.
+        """
+        winfiles = self._iter_matched()
+        if self._order_by is not None:
+            attr_name, reverse = self._order_by
+
+            def key(winfile):
+                # 只把读取排序属性的错误转换为ValueError, 筛选条件中的错误原样抛出
+                try:
+                    return getattr(winfile, attr_name)
+                except AttributeError:
+                    raise _sortable_error()
+
+            if self._limit is not None:
+                # 只在堆中保留前n个, 与 sorted(...)[:n] 的结果相同
+                if reverse:
+                    winfiles = heapq.nlargest(self._limit, winfiles, key=key)
+                else:
+                    winfiles = heapq.nsmallest(self._limit, winfiles, key=key)
+            else:
+                winfiles = sorted(winfiles, key=key, reverse=reverse)
+        elif self._limit is not None:
+            winfiles = itertools.islice(winfiles, self._limit)
+
+        load_md5 = (self.detail if self.detail is not None
+                    else WinFile.init_mode) == 3
+        for winfile in winfiles:
+            if load_md5:
+                winfile.load_digests(("md5", ))
+            yield winfile
+
+    def __iter__(self):
+        return self.iter()
+
+    def to_collection(self):
+        """Execute the query, return a :class:`filetool.files.FileCollection`,
+        files are in the query order.
+        """
+        fc = FileCollection()
+        for winfile in self.iter():
+            fc.files[winfile.abspath] = winfile
+        return fc
+
+
+#--- Unittest ---
+if __name__ == "__main__":
+    import os
+    import shutil
+    import tempfile
+    import unittest
+
+    from filetool.files import FileFilter
+
+    class Unittest(unittest.TestCase):
+        def setUp(self):
+            self.root = tempfile.mkdtemp()
+            os.mkdir(os.path.join(self.root, "sub"))
+            for i, relpath in enumerate([
+                    "a.log", "b.log", "c.jpg", os.path.join("sub", "d.log"),
+                    os.path.join("sub", "e.txt")]):
+                with open(os.path.join(self.root, relpath), "wb") as f:
+                    f.write(b"x" * i)
+
+        def tearDown(self):
+            shutil.rmtree(self.root)
+
+        def basenames(self, query):
+            return [winfile.basename for winfile in query]
+
+        def test_where(self):
+            query = FileQuery(self.root).where(ext=".log")
+            self.assertEqual(
+                sorted(self.basenames(query)), ["a.log", "b.log", "d.log"])
+            self.assertEqual(
+                self.basenames(FileQuery(self.root).where(FileFilter.image)),
+                ["c.jpg"])
+            self.assertEqual(
+                sorted(self.basenames(FileQuery(self.root).exclude(
+                    ext=[".log", ".jpg"]))),
+                ["e.txt"])
+
+        def test_order_by_limit(self):
+            query = FileQuery(self.root).where(ext=".log") \
+                .order_by("size_on_disk", reverse=True)
+            self.assertEqual(
+                self.basenames(query), ["d.log", "b.log", "a.log"])
+            self.assertEqual(
+                self.basenames(query.limit(2)), ["d.log", "b.log"])
+            self.assertEqual(
+                self.basenames(query.order_by("size_on_disk").limit(2)),
+                ["a.log", "b.log"])
+            self.assertEqual(len(list(FileQuery(self.root).limit(2))), 2)
+
+        def test_errors(self):
+            def buggy(winfile):
+                return winfile.no_such_attribute
+
+            query = FileQuery(self.root).where(buggy).order_by("size_on_disk")
+            self.assertRaises(AttributeError, list, query)
+            query = FileQuery(self.root).order_by("no_such_attribute")
+            self.assertRaises(ValueError, list, query)
+
+        def test_recursive(self):
+            query = FileQuery(self.root, recursive=False).where(ext=".log")
+            self.assertEqual(
+                sorted(self.basenames(query)), ["a.log", "b.log"])
+
+    unittest.main()
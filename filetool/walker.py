@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+A directory tree walker built on ``os.scandir``.
+
+Unlike ``os.walk``, which only gives you names, these functions yield the
+``DirEntry`` objects themselves. A ``DirEntry`` carries the file type from
+the directory listing (``d_type``), and caches its ``stat()`` result, so the
+caller pays one ``getdents`` per directory and at most one ``stat`` per file.
+
+- :func:`walk`: ``os.walk`` like iterator, yield ``(dir, dir_entries,
+  file_entries)``.
+- :func:`iter_file_entries`: yield ``DirEntry`` of all files.
+- :func:`iter_dir_entries`: yield ``DirEntry`` of all sub directories.
+- :func:`parallel_walk`: same as :func:`walk`, but directories are listed by
+  a pool of worker threads, for high latency file systems.
+
+**中文文档**
+
+基于 ``os.scandir`` 的目录遍历器。与 ``os.walk`` 只返回文件名不同, 这里返回的是
+``DirEntry`` 对象, 其中缓存了文件类型和 ``stat`` 的结果, 使得之后创建 WinFile
+时无需再次访问磁盘。
+"""
+
+import os
+import threading
+
+try:
+    from queue import Queue, Full, Empty
+except ImportError:  # pragma: no cover, python2
+    from Queue import Queue, Full, Empty
+
+try:
+    from os import scandir
+except ImportError:  # pragma: no cover, python2
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+
+class _ListdirEntry(object):
+    """A minimal ``os.DirEntry`` replacement built on ``os.listdir``, only used
+    when ``scandir`` is not available.
+    """
+    __slots__ = ["name", "path", "_stat", "_lstat"]
+
+    def __init__(self, dir_abspath, name):
+        self.name = name
+        self.path = os.path.join(dir_abspath, name)
+        self._stat = None
+        self._lstat = None
+
+    def stat(self, follow_symlinks=True):
+        if follow_symlinks:
+            if self._stat is None:
+                self._stat = os.stat(self.path)
+            return self._stat
+        else:
+            if self._lstat is None:
+                self._lstat = os.lstat(self.path)
+            return self._lstat
+
+    def is_dir(self, follow_symlinks=True):
+        return os.path.isdir(self.path) if follow_symlinks \
+            else (not self.is_symlink() and os.path.isdir(self.path))
+
+    def is_file(self, follow_symlinks=True):
+        return os.path.isfile(self.path) if follow_symlinks \
+            else (not self.is_symlink() and os.path.isfile(self.path))
+
+    def is_symlink(self):
+        return os.path.islink(self.path)
+
+
+def _scandir(dir_abspath):
+    if scandir is None:
+        return [_ListdirEntry(dir_abspath, name)
+                for name in os.listdir(dir_abspath)]
+    return scandir(dir_abspath)
+
+
+def scan(dir_abspath):
+    """List one directory, split its entries into directories and others.
+
+    Same classification rule as ``os.walk``: anything that is a directory
+    (symlink followed) goes to ``dir_entries``, everything else goes to
+    ``file_entries``.
+
+    :return: ``(dir_entries, file_entries)``, or ``None`` if the directory
+      can't be listed.
+    """
+    dir_entries, file_entries = list(), list()
+    try:
+        it = _scandir(dir_abspath)
+        try:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    dir_entries.append(entry)
+                else:
+                    file_entries.append(entry)
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+    except OSError:  # permission denied, or removed during the walk
+        return None
+    return dir_entries, file_entries
+
+
+def _descend_into(entry):
+    """Same as ``os.walk(followlinks=False)``, never follow a symlink dir.
+    """
+    try:
+        return not entry.is_symlink()
+    except OSError:
+        return False
+
+
+def walk(dir_abspath, recursive=True):
+    """``os.walk`` like top-down directory tree iterator, but yield
+    ``(current_dir, dir_entries, file_entries)``, and the entries are
+    ``DirEntry`` objects. The visiting order is exactly the same as ``os.walk``.
+
+    Unreadable directories are silently skipped, like ``os.walk`` does.
+
+    :param dir_abspath: the absolute path of the root directory.
+    :param recursive: if False, only yield the root directory.
+
+    **中文文档**
+
+    与 ``os.walk`` 的遍历顺序完全相同, 但返回的是 ``DirEntry`` 对象。
+    """
+    stack = [dir_abspath, ]
+    while stack:
+        current_dir = stack.pop()
+        result = scan(current_dir)
+        if result is None:
+            continue
+        dir_entries, file_entries = result
+        yield current_dir, dir_entries, file_entries
+
+        if recursive:
+            for entry in reversed(dir_entries):
+                if _descend_into(entry):
+                    stack.append(entry.path)
+
+
+def iter_file_entries(dir_abspath, recursive=True):
+    """Yield ``DirEntry`` of all files under ``dir_abspath``.
+    """
+    for _, _, file_entries in walk(dir_abspath, recursive=recursive):
+        for entry in file_entries:
+            yield entry
+
+
+def iter_dir_entries(dir_abspath, recursive=True):
+    """Yield ``DirEntry`` of all sub directories under ``dir_abspath``.
+    """
+    for _, dir_entries, _ in walk(dir_abspath, recursive=recursive):
+        for entry in dir_entries:
+            yield entry
+
+
+#: seconds an idle worker waits for a task before checking the stop flag.
+_WORKER_POLL_INTERVAL = 0.05
+
+
+def _worker(task_queue, result_queue, file_func, stop):
+    while True:
+        try:
+            dir_abspath = task_queue.get(timeout=_WORKER_POLL_INTERVAL)
+        except Empty:  # 空闲时定期检查是否需要退出
+            if stop.is_set():
+                break
+            continue
+        if (dir_abspath is None) or stop.is_set():
+            break
+        try:
+            result = scan(dir_abspath)
+            if (result is not None) and (file_func is not None):
+                dir_entries, file_entries = result
+                result = dir_entries, [file_func(entry)
+                                       for entry in file_entries]
+            result_queue.put((dir_abspath, result, None))
+        except Exception as e:
+            result_queue.put((dir_abspath, None, e))
+
+
+def parallel_walk(dir_abspath, workers=4, recursive=True, file_func=None,
+                  queue_size=None):
+    """Same as :func:`walk`, but directories are listed by ``workers``
+    threads. On network file systems, where each ``scandir`` / ``stat`` round
+    trip costs milliseconds, this keeps many requests in flight.
+
+    Results are yielded in exactly the same order as :func:`walk`.
+
+    :param dir_abspath: the absolute path of the root directory.
+    :param workers: number of worker threads.
+    :param recursive: if False, only yield the root directory.
+    :param file_func: optional, a function applied to each file ``DirEntry``
+      in the worker thread, for example to ``stat`` it. If given, the third
+      item of each yielded tuple is the list of its return values.
+    :param queue_size: max number of directories waiting for a worker.
+      Default is ``2 * workers``.
+
+    **中文文档**
+
+    多线程版本的 :func:`walk`, 由多个线程同时读取不同的目录, 适用于每次磁盘访问
+    延迟都很高的网络文件系统。返回结果的顺序与 :func:`walk` 完全相同。
+    """
+    if queue_size is None:
+        queue_size = 2 * workers
+    task_queue = Queue(maxsize=queue_size)  # 待读取的目录, 有上限
+    result_queue = Queue()
+    stop = threading.Event()
+
+    threads = list()
+    for _ in range(workers):
+        thread = threading.Thread(
+            target=_worker,
+            args=(task_queue, result_queue, file_func, stop),
+        )
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    pending = [dir_abspath, ]  # 已发现但尚未提交的目录
+    results = dict()  # 已读取但尚未yield的目录
+    stack = [dir_abspath, ]  # 与 walk() 相同的遍历顺序
+    in_flight = 0
+    try:
+        while stack:
+            current_dir = stack[-1]
+            if current_dir not in results:
+                # submit as many directories as the queue allows, most
+                # recently discovered first, they are the next to be yielded
+                while pending:
+                    try:
+                        task_queue.put_nowait(pending[-1])
+                    except Full:
+                        break
+                    pending.pop()
+                    in_flight += 1
+
+                path, result, error = result_queue.get()
+                in_flight -= 1
+                results[path] = (result, error)
+                if recursive and (result is not None):
+                    for entry in reversed(result[0]):
+                        if _descend_into(entry):
+                            pending.append(entry.path)
+                continue
+
+            stack.pop()
+            result, error = results.pop(current_dir)
+            if error is not None:
+                raise error
+            if result is None:
+                continue
+            dir_entries, file_items = result
+            yield current_dir, dir_entries, file_items
+
+            if recursive:
+                for entry in reversed(dir_entries):
+                    if _descend_into(entry):
+                        stack.append(entry.path)
+    finally:
+        # idle workers poll ``stop``, the sentinels only wake them up sooner,
+        # so every thread exits even if the queue is smaller than ``workers``
+        stop.set()
+        for _ in threads:
+            try:
+                task_queue.put_nowait(None)
+            except Full:
+                break